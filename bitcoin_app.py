@@ -3,9 +3,27 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.offline import get_plotlyjs
 from plotly.subplots import make_subplots
 import plotly.figure_factory as ff
 from datetime import datetime, timedelta
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+import base64
+import hashlib
+import html
+import io
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+import uuid
+import weakref
+import zlib
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -227,7 +245,7 @@ def plot_buy_sell_analysis(df):
     )
     
     # Volume by side
-    volume_data = df.groupby(['classification', 'Side'])['Size USD'].sum().unstack(fill_value=0)
+    volume_data = df.groupby(['classification', 'Side'])['Size USD'].sum().unstack(fill_value=0).reindex(columns=['BUY', 'SELL'], fill_value=0)
     
     fig.add_trace(
         go.Bar(x=volume_data.index, y=volume_data['BUY'], name='Buy Volume', 
@@ -249,7 +267,7 @@ def plot_buy_sell_analysis(df):
     )
     
     # Trade count
-    trade_count = df.groupby(['classification', 'Side']).size().unstack(fill_value=0)
+    trade_count = df.groupby(['classification', 'Side']).size().unstack(fill_value=0).reindex(columns=['BUY', 'SELL'], fill_value=0)
     fig.add_trace(
         go.Bar(x=trade_count.index, y=trade_count['BUY'], name='Buy Count', 
                marker_color='#10b981', opacity=0.8),
@@ -272,6 +290,8 @@ def plot_buy_sell_analysis(df):
 
 def plot_order_type_analysis(df):
     """Create order type (crossed) analysis"""
+    tensor = build_pivot_tensor(df)
+
     fig = make_subplots(
         rows=2, cols=2,
         subplot_titles=('PnL by Order Type', 'Win Rate Heatmap', 
@@ -281,25 +301,22 @@ def plot_order_type_analysis(df):
     )
     
     # PnL by order type
-    order_pnl = df.groupby('Crossed')['Closed PnL'].sum()
-    order_labels = ['Limit Order', 'Market Order']
+    order_pnl = tensor.reduce(['Order Type'])['PnL']
     
     fig.add_trace(
-        go.Bar(x=order_labels, y=order_pnl.values, 
+        go.Bar(x=order_pnl.index, y=order_pnl.values, 
                marker_color=[PURPLE_PALETTE[0], PURPLE_PALETTE[2]]),
         row=1, col=1
     )
     
     # Win rate heatmap
-    win_rate_data = df.groupby(['Crossed', 'classification'])['Closed PnL'].apply(
-        lambda x: (x > 0).mean() * 100
-    ).unstack()
+    win_rate_data = tensor.pivot('Order Type', 'classification', 'Win Rate (%)')
     
     fig.add_trace(
         go.Heatmap(
             z=win_rate_data.values,
             x=win_rate_data.columns,
-            y=['Limit Order', 'Market Order'],
+            y=win_rate_data.index,
             colorscale='Viridis',
             showscale=True
         ),
@@ -307,13 +324,13 @@ def plot_order_type_analysis(df):
     )
     
     # Average PnL heatmap
-    avg_pnl_data = df.groupby(['Crossed', 'classification'])['Closed PnL'].mean().unstack()
+    avg_pnl_data = tensor.pivot('Order Type', 'classification', 'Avg PnL')
     
     fig.add_trace(
         go.Heatmap(
             z=avg_pnl_data.values,
             x=avg_pnl_data.columns,
-            y=['Limit Order', 'Market Order'],
+            y=avg_pnl_data.index,
             colorscale='RdYlGn',
             showscale=True
         ),
@@ -321,11 +338,11 @@ def plot_order_type_analysis(df):
     )
     
     # Fee analysis
-    fee_data = df.groupby(['Crossed', 'classification'])['Fee'].mean().unstack()
+    fee_data = tensor.pivot('Order Type', 'classification', 'Avg Fee')
     
     for i, classification in enumerate(fee_data.columns):
         fig.add_trace(
-            go.Bar(x=['Limit Order', 'Market Order'], y=fee_data[classification].values, 
+            go.Bar(x=fee_data.index, y=fee_data[classification].values, 
                    name=classification, marker_color=PURPLE_PALETTE[i % len(PURPLE_PALETTE)]),
             row=2, col=2
         )
@@ -405,6 +422,240 @@ def plot_value_analysis(df):
     
     return fig, value_data
 
+def build_daily_rollups(df):
+    """Roll trades up to one row per calendar day"""
+    day = pd.DatetimeIndex(df.index).normalize()
+    daily = df.groupby(day).agg({
+        'value': 'mean',
+        'Closed PnL': 'sum',
+        'Execution Price': 'mean',
+        'Size USD': 'sum'
+    })
+    daily['Trade_Count'] = df.groupby(day).size()
+
+    # Reindex to a continuous calendar so a lag of N rows is N days
+    calendar = pd.date_range(daily.index.min(), daily.index.max(), freq='D')
+    daily = daily.reindex(calendar)
+    daily.index.name = 'date_only'
+    daily['value_delta'] = daily['value'].diff()
+
+    return daily
+
+def _cross_sums(a, b, max_lag):
+    """Sum of a[t] * b[t + k] for every k in [-max_lag, max_lag] via FFT"""
+    n = len(a)
+    size = 1 << int(2 * n - 1).bit_length()
+    spectrum = np.conj(np.fft.rfft(a, size)) * np.fft.rfft(b, size)
+    full = np.fft.irfft(spectrum, size)
+    lags = np.arange(-max_lag, max_lag + 1)
+    return full[lags % size]
+
+def compute_lag_correlations(daily, signal='value', target='Closed PnL',
+                             min_lag=0, max_lag=30, method='pearson'):
+    """Correlate the daily signal with the target N days ahead for every lag"""
+    x = daily[signal].to_numpy(dtype=float)
+    y = daily[target].to_numpy(dtype=float)
+
+    if method == 'spearman':
+        # Ranks are taken once over the whole series, not per lag window
+        x = daily[signal].rank().to_numpy(dtype=float)
+        y = daily[target].rank().to_numpy(dtype=float)
+
+    # Days without a value are masked out of every sum rather than dropped,
+    # so all lags come from the same six FFT passes
+    mx = ~np.isnan(x)
+    my = ~np.isnan(y)
+    x = np.where(mx, x, 0.0)
+    y = np.where(my, y, 0.0)
+    mx = mx.astype(float)
+    my = my.astype(float)
+
+    max_lag = min(max(abs(min_lag), abs(max_lag)), len(x) - 1)
+    n = np.rint(_cross_sums(mx, my, max_lag))
+    sx = _cross_sums(x, my, max_lag)
+    sy = _cross_sums(mx, y, max_lag)
+    sxx = _cross_sums(x * x, my, max_lag)
+    syy = _cross_sums(mx, y * y, max_lag)
+    sxy = _cross_sums(x, y, max_lag)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sxy - sx * sy / n
+        var_x = sxx - sx * sx / n
+        var_y = syy - sy * sy / n
+        corr = cov / np.sqrt(var_x * var_y)
+
+    # Too few overlapping days or a constant window gives no correlation
+    corr[(n < 3) | (var_x <= 1e-12) | (var_y <= 1e-12)] = np.nan
+
+    lag_df = pd.DataFrame({
+        'Lag_Days': np.arange(-max_lag, max_lag + 1),
+        'Correlation': np.clip(corr, -1, 1),
+        'Overlap_Days': n.astype(int)
+    })
+    lag_df = lag_df[(lag_df['Lag_Days'] >= min_lag) & (lag_df['Lag_Days'] <= max_lag)]
+
+    return lag_df.set_index('Lag_Days')
+
+def plot_lag_correlation(lag_df, signal, target):
+    """Create lead/lag correlation chart"""
+    colors = ['#10b981' if c >= 0 else '#ef4444' for c in lag_df['Correlation'].fillna(0)]
+
+    fig = go.Figure(
+        go.Bar(x=lag_df.index, y=lag_df['Correlation'], marker_color=colors,
+               customdata=lag_df['Overlap_Days'],
+               hovertemplate='Lag %{x} days<br>Correlation: %{y:.4f}<br>Overlap: %{customdata} days<extra></extra>')
+    )
+
+    fig.update_layout(
+        height=400,
+        title_text=f"{signal} vs {target} N Days Ahead",
+        title_x=0.5,
+        showlegend=False,
+        **create_plotly_theme()['layout']
+    )
+    fig.update_xaxes(title_text='Lag (days)')
+    fig.update_yaxes(title_text='Correlation')
+
+    return fig
+
+# Trade size buckets on Size USD
+SIZE_BUCKET_EDGES = [100, 1_000, 10_000, 100_000]
+SIZE_BUCKET_LABELS = ['<$100', '$100-1K', '$1K-10K', '$10K-100K', '$100K+']
+
+def size_buckets(size_usd):
+    """Assign every trade to a Size USD bucket"""
+    codes = np.searchsorted(SIZE_BUCKET_EDGES, np.asarray(size_usd, dtype=float), side='right')
+    return pd.Categorical.from_codes(codes, SIZE_BUCKET_LABELS)
+
+# Finest grain of the price aggregates; coarser views are re-sums of it.
+# Coin joins the grain when present so VWAP and TWAP never mix coins
+PRICE_AGGREGATE_DIMS = ['Day', 'classification', 'Side']
+PRICE_WEIGHTINGS = {
+    'Unweighted': 'Mean_Price',
+    'Volume-Weighted (VWAP)': 'VWAP',
+    'Time-Weighted (TWAP)': 'TWAP'
+}
+
+@st.cache_data(show_spinner=False)
+def build_price_aggregates(df):
+    """Additive price sums and size histograms per day, classification, side and coin in one grouped pass"""
+    keys = pd.DataFrame({
+        'Day': pd.DatetimeIndex(df.index).normalize(),
+        'classification': df['classification'].to_numpy(),
+        'Side': df['Side'].to_numpy()
+    })
+    dims = PRICE_AGGREGATE_DIMS
+    if 'Coin' in df.columns:
+        keys['Coin'] = df['Coin'].to_numpy()
+        dims = dims + ['Coin']
+    group_ids, index = build_partition_index(keys, dims)
+    n = len(index)
+
+    price = df['Execution Price'].to_numpy(dtype=float)
+    notional = df['Size USD'].to_numpy(dtype=float)
+    tokens = np.abs(df['Size Tokens'].to_numpy(dtype=float)) if 'Size Tokens' in df.columns else notional / price
+
+    # Each price holds until the group's next fill; the last fill of a group carries no time
+    times = fill_times_hours(df)
+    order = np.lexsort((times, group_ids))
+    held = np.zeros(len(df))
+    same_group = group_ids[order][1:] == group_ids[order][:-1]
+    held[order[:-1]] = np.where(same_group, np.diff(times[order]), 0.0)
+
+    aggregates = pd.DataFrame({
+        'Trades': np.bincount(group_ids, minlength=n),
+        'Price_Sum': np.bincount(group_ids, weights=price, minlength=n),
+        'Price_Sq_Sum': np.bincount(group_ids, weights=price * price, minlength=n),
+        'Notional': np.bincount(group_ids, weights=notional, minlength=n),
+        'Tokens': np.bincount(group_ids, weights=tokens, minlength=n),
+        'Held_Price_Sum': np.bincount(group_ids, weights=price * held, minlength=n),
+        'Held_Hours': np.bincount(group_ids, weights=held, minlength=n)
+    }, index=index)
+
+    bucket_codes = size_buckets(notional).codes.astype(np.int64)
+    histogram = np.bincount(group_ids * len(SIZE_BUCKET_LABELS) + bucket_codes,
+                            minlength=n * len(SIZE_BUCKET_LABELS)).reshape(n, len(SIZE_BUCKET_LABELS))
+    for i, label in enumerate(SIZE_BUCKET_LABELS):
+        aggregates[label] = histogram[:, i]
+
+    return aggregates
+
+def summarize_price_aggregates(aggregates, dims):
+    """Roll price aggregates up to the given dimensions with unweighted, VWAP and TWAP prices.
+
+    VWAP and TWAP are computed per coin first; across coins they are averaged
+    weighted by Size USD, so cheap coins with huge token counts cannot dominate.
+    """
+    summary = aggregates.groupby(level=dims, observed=True, sort=True).sum()
+    trades = summary['Trades']
+
+    summary['Mean_Price'] = summary['Price_Sum'] / trades
+    summary['Std_Price'] = np.sqrt(np.maximum(
+        (summary['Price_Sq_Sum'] - trades * summary['Mean_Price'] ** 2) / (trades - 1).replace(0, np.nan), 0))
+
+    coin_dims = dims + [dim for dim in ['Coin'] if dim in aggregates.index.names and dim not in dims]
+    by_coin = aggregates.groupby(level=coin_dims, observed=True, sort=True).sum()
+    by_coin_vwap = by_coin['Notional'] / by_coin['Tokens'].replace(0, np.nan)
+    # Coins without elapsed time between fills fall back to their plain mean
+    by_coin_twap = (by_coin['Held_Price_Sum'] / by_coin['Held_Hours'].replace(0, np.nan)).fillna(
+        by_coin['Price_Sum'] / by_coin['Trades'])
+
+    def usd_weighted(prices):
+        weights = by_coin['Notional'].where(prices.notna(), 0.0)
+        totals = pd.DataFrame({'Weighted': (prices * weights).fillna(0.0), 'Weight': weights})
+        totals = totals.groupby(level=dims, observed=True, sort=True).sum()
+        return (totals['Weighted'] / totals['Weight'].replace(0, np.nan)).reindex(summary.index)
+
+    summary['VWAP'] = usd_weighted(by_coin_vwap)
+    summary['TWAP'] = usd_weighted(by_coin_twap).fillna(summary['Mean_Price'])
+
+    return summary.drop(columns=['Price_Sum', 'Price_Sq_Sum', 'Tokens', 'Held_Price_Sum', 'Held_Hours'])
+
+def plot_size_distribution(summary):
+    """Create trade count and volume share by size bucket for each side"""
+    fig = make_subplots(
+        rows=1, cols=2,
+        subplot_titles=('Trade Count by Size Bucket', 'Trade Share by Size Bucket (%)')
+    )
+
+    colors = {'BUY': '#10b981', 'SELL': '#ef4444'}
+    for side, counts in summary[SIZE_BUCKET_LABELS].iterrows():
+        fig.add_trace(
+            go.Bar(x=SIZE_BUCKET_LABELS, y=counts.values, name=side,
+                   marker_color=colors.get(side, PURPLE_PALETTE[0]), opacity=0.8, legendgroup=side),
+            row=1, col=1
+        )
+        fig.add_trace(
+            go.Bar(x=SIZE_BUCKET_LABELS, y=counts.values / max(counts.sum(), 1) * 100, name=side,
+                   marker_color=colors.get(side, PURPLE_PALETTE[0]), opacity=0.8, legendgroup=side, showlegend=False),
+            row=1, col=2
+        )
+
+    fig.update_layout(
+        height=400,
+        title_text="Trade Size Distribution",
+        title_x=0.5,
+        **create_plotly_theme()['layout']
+    )
+
+    return fig
+
+def plot_price_trend(daily_prices, column):
+    """Create the daily execution price trend by classification"""
+    price_trend = daily_prices[column].unstack('classification')
+    price_trend.index.name = 'date_only'
+
+    fig = px.line(
+        price_trend.reset_index(),
+        x='date_only',
+        y=price_trend.columns.tolist(),
+        title="Average Execution Price Trend by Classification",
+        color_discrete_sequence=PURPLE_PALETTE
+    )
+    fig.update_layout(**create_plotly_theme()['layout'])
+
+    return fig
+
 def plot_direction_analysis(df):
     """Create trading direction analysis"""
     fig = make_subplots(
@@ -453,7 +704,7 @@ def plot_direction_analysis(df):
     )
     
     # Direction PnL heatmap
-    direction_heatmap = df.groupby(['Direction', 'classification'])['Closed PnL'].mean().unstack()
+    direction_heatmap = build_pivot_tensor(df).pivot('Direction', 'classification', 'Avg PnL')
     
     fig.add_trace(
         go.Heatmap(
@@ -475,62 +726,2051 @@ def plot_direction_analysis(df):
     
     return fig, comparison_data
 
-def plot_execution_price_analysis(df):
-    """Create execution price analysis"""
-    price_stats = df.groupby('classification')['Execution Price'].agg([
-        'mean', 'std', 'min', 'max', 'median'
-    ]).round(4)
-    
-    price_stats['CV'] = (price_stats['std'] / price_stats['mean']).round(4)
-    
-    fig = make_subplots(
-        rows=2, cols=2,
-        subplot_titles=('Price Distribution by Classification', 'Average Price by Classification',
-                       'Price Volatility (CV)', 'Price Range Analysis'),
-        specs=[[{"secondary_y": False}, {"secondary_y": False}],
-               [{"secondary_y": False}, {"secondary_y": False}]]
-    )
-    
-    # Box plot for price distribution
-    for i, classification in enumerate(df['classification'].unique()):
-        subset = df[df['classification'] == classification]
-        fig.add_trace(
-            go.Box(y=subset['Execution Price'], name=classification,
-                   marker_color=PURPLE_PALETTE[i % len(PURPLE_PALETTE)]),
-            row=1, col=1
-        )
-    
-    # Average price
-    fig.add_trace(
-        go.Bar(x=price_stats.index, y=price_stats['mean'], 
-               marker_color=PURPLE_PALETTE[0]),
-        row=1, col=2
-    )
-    
-    # Price volatility (CV)
-    fig.add_trace(
-        go.Bar(x=price_stats.index, y=price_stats['CV'], 
-               marker_color=PURPLE_PALETTE[1]),
-        row=2, col=1
-    )
-    
-    # Price range
-    price_range = price_stats['max'] - price_stats['min']
-    fig.add_trace(
-        go.Bar(x=price_stats.index, y=price_range.values, 
-               marker_color=PURPLE_PALETTE[2]),
-        row=2, col=2
-    )
-    
-    fig.update_layout(
-        height=600,
-        title_text="Execution Price Analysis by Classification",
-        title_x=0.5,
-        showlegend=False,
-        **create_plotly_theme()['layout']
-    )
-    
-    return fig, price_stats
+class QuantileSketch:
+    """Mergeable t-digest style quantile sketch kept for many groups at once"""
+
+    def __init__(self, compression=200):
+        self.compression = compression
+        self.keys = []
+        self.names = None
+        self._key_ids = {}
+        self.group = np.zeros(0, dtype=np.int64)
+        self.mean = np.zeros(0)
+        self.weight = np.zeros(0)
+        self.min = np.zeros(0)
+        self.max = np.zeros(0)
+
+    def _ids_for(self, keys):
+        """Map keys to group ids, registering unseen keys"""
+        ids = np.empty(len(keys), dtype=np.int64)
+        for i, key in enumerate(keys):
+            if key not in self._key_ids:
+                self._key_ids[key] = len(self.keys)
+                self.keys.append(key)
+            ids[i] = self._key_ids[key]
+
+        grow = len(self.keys) - len(self.min)
+        if grow > 0:
+            self.min = np.r_[self.min, np.full(grow, np.inf)]
+            self.max = np.r_[self.max, np.full(grow, -np.inf)]
+        return ids
+
+    def _absorb(self, group, mean, weight, group_min, group_max):
+        """Fold new centroids into the sketch and recompress every group"""
+        self.min = np.minimum(self.min, group_min)
+        self.max = np.maximum(self.max, group_max)
+
+        group = np.r_[self.group, group]
+        mean = np.r_[self.mean, mean]
+        weight = np.r_[self.weight, weight]
+        if len(group) == 0:
+            return
+
+        # Stable sort by value then by group gives group-major, value-minor order
+        order = np.argsort(mean, kind='stable')
+        order = order[np.argsort(group[order], kind='stable')]
+        group, mean, weight = group[order], mean[order], weight[order]
+
+        # Cumulative weight within each group, as a quantile at each centroid's midpoint
+        group_start = np.r_[True, group[1:] != group[:-1]]
+        running = np.cumsum(weight)
+        before = running - weight
+        offset = np.maximum.accumulate(np.where(group_start, before, 0.0))
+        totals = np.bincount(group, weights=weight)
+        q_mid = (before - offset + weight / 2) / totals[group]
+
+        # The arcsine scale keeps buckets small near the tails and wide in the middle
+        bucket = np.floor(self.compression / (2 * np.pi) * np.arcsin(2 * q_mid - 1))
+        boundaries = np.flatnonzero(group_start | np.r_[True, bucket[1:] != bucket[:-1]])
+
+        self.weight = np.add.reduceat(weight, boundaries)
+        self.mean = np.add.reduceat(mean * weight, boundaries) / self.weight
+        self.group = group[boundaries]
+
+    def update(self, codes, labels, values):
+        """Add a batch of raw values, each tagged with a code into labels"""
+        values = np.asarray(values, dtype=float)
+        valid = ~np.isnan(values)
+        group = self._ids_for(list(labels))[codes[valid]]
+        self.names = self.names or list(labels.names)
+        values = values[valid]
+
+        group_min = np.full(len(self.keys), np.inf)
+        group_max = np.full(len(self.keys), -np.inf)
+        np.minimum.at(group_min, group, values)
+        np.maximum.at(group_max, group, values)
+
+        self._absorb(group, values, np.ones(len(values)), group_min, group_max)
+        return self
+
+    def merge(self, other):
+        """Merge another sketch built over a different batch or partition"""
+        ids = self._ids_for(other.keys)
+        self.names = self.names or other.names
+        group_min = np.full(len(self.keys), np.inf)
+        group_max = np.full(len(self.keys), -np.inf)
+        group_min[ids] = other.min
+        group_max[ids] = other.max
+
+        self._absorb(ids[other.group], other.mean, other.weight, group_min, group_max)
+        return self
+
+    def quantile(self, key, q):
+        """Estimate quantile(s) q of a key"""
+        q = np.asarray(q, dtype=float)
+        if key not in self._key_ids:
+            return np.full(q.shape, np.nan)
+
+        key_id = self._key_ids[key]
+        mask = self.group == key_id
+        mean, weight = self.mean[mask], self.weight[mask]
+        total = weight.sum()
+
+        # Interpolate between centroid midpoints, anchored on the exact min and max
+        midpoints = np.cumsum(weight) - weight / 2
+        return np.interp(q * total, np.r_[0.0, midpoints, total],
+                         np.r_[self.min[key_id], mean, self.max[key_id]])
+
+    def quantile_table(self, quantiles):
+        """Quantiles for every key as a DataFrame"""
+        if self.names and len(self.names) > 1:
+            index = pd.MultiIndex.from_tuples(self.keys, names=self.names)
+        else:
+            index = pd.Index(self.keys, name=self.names[0] if self.names else None)
+        table = pd.DataFrame([self.quantile(key, quantiles) for key in self.keys], index=index,
+                             columns=[f"p{q * 100:g}" for q in quantiles])
+        return table.sort_index()
+
+# Columns and groupings summarized by quantile sketches
+SKETCH_COLUMNS = ['Execution Price', 'Closed PnL', 'Size USD']
+SKETCH_GROUPINGS = {
+    'classification': ['classification'],
+    'classification × Side': ['classification', 'Side'],
+    'value': ['value']
+}
+
+def _sketch_batch(batch, columns, groupings, compression):
+    """Sketch one batch of trades for every column and grouping"""
+    sketches = {}
+    for grouping, keys in groupings.items():
+        codes, labels = build_partition_index(batch, keys)
+        for column in columns:
+            sketches[(column, grouping)] = QuantileSketch(compression).update(codes, labels, batch[column])
+    return sketches
+
+@st.cache_data(show_spinner=False)
+def build_quantile_sketches(df, columns=tuple(SKETCH_COLUMNS), batch_size=250_000, workers=4, compression=200):
+    """Sketch quantiles in parallel batches and merge them into one sketch per column and grouping"""
+    columns = [col for col in columns if col in df.columns]
+    batches = [df.iloc[start:start + batch_size] for start in range(0, max(len(df), 1), batch_size)]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        partials = list(executor.map(
+            lambda batch: _sketch_batch(batch, columns, SKETCH_GROUPINGS, compression), batches
+        ))
+
+    sketches = partials[0]
+    for partial in partials[1:]:
+        for name, sketch in partial.items():
+            sketches[name].merge(sketch)
+
+    return sketches
+
+def plot_execution_price_analysis(df, sketches=None):
+    """Create execution price analysis"""
+    price_stats = df.groupby('classification')['Execution Price'].agg([
+        'mean', 'std', 'min', 'max'
+    ])
+
+    # Quartiles come from the mergeable sketch rather than a full sort per classification
+    if sketches is None:
+        sketches = build_quantile_sketches(df)
+    price_sketch = sketches[('Execution Price', 'classification')]
+    quartiles = pd.DataFrame(
+        {classification: price_sketch.quantile(classification, [0.25, 0.5, 0.75]) for classification in price_stats.index},
+        index=['q1', 'median', 'q3']
+    ).T
+    price_stats['median'] = quartiles['median']
+    price_stats = price_stats.round(4)
+
+    price_stats['CV'] = (price_stats['std'] / price_stats['mean']).round(4)
+
+    fig = make_subplots(
+        rows=2, cols=2,
+        subplot_titles=('Price Distribution by Classification', 'Average Price by Classification',
+                       'Price Volatility (CV)', 'Price Range Analysis'),
+        specs=[[{"secondary_y": False}, {"secondary_y": False}],
+               [{"secondary_y": False}, {"secondary_y": False}]]
+    )
+    
+    # Box plot for price distribution, drawn from precomputed quartiles
+    for i, classification in enumerate(df['classification'].unique()):
+        q1, median, q3 = quartiles.loc[classification, ['q1', 'median', 'q3']]
+        iqr = q3 - q1
+        fig.add_trace(
+            go.Box(q1=[q1], median=[median], q3=[q3],
+                   lowerfence=[max(price_stats.loc[classification, 'min'], q1 - 1.5 * iqr)],
+                   upperfence=[min(price_stats.loc[classification, 'max'], q3 + 1.5 * iqr)],
+                   x=[classification], name=classification,
+                   marker_color=PURPLE_PALETTE[i % len(PURPLE_PALETTE)]),
+            row=1, col=1
+        )
+    
+    # Average price
+    fig.add_trace(
+        go.Bar(x=price_stats.index, y=price_stats['mean'], 
+               marker_color=PURPLE_PALETTE[0]),
+        row=1, col=2
+    )
+    
+    # Price volatility (CV)
+    fig.add_trace(
+        go.Bar(x=price_stats.index, y=price_stats['CV'], 
+               marker_color=PURPLE_PALETTE[1]),
+        row=2, col=1
+    )
+    
+    # Price range
+    price_range = price_stats['max'] - price_stats['min']
+    fig.add_trace(
+        go.Bar(x=price_stats.index, y=price_range.values, 
+               marker_color=PURPLE_PALETTE[2]),
+        row=2, col=2
+    )
+    
+    fig.update_layout(
+        height=600,
+        title_text="Execution Price Analysis by Classification",
+        title_x=0.5,
+        showlegend=False,
+        **create_plotly_theme()['layout']
+    )
+    
+    return fig, price_stats
+
+# Optional partition dimensions carried through from the raw trade log
+PARTITION_COLUMNS = ['Account', 'Coin']
+
+def build_partition_index(df, dims):
+    """Map every trade to a dense partition id over the given categorical columns"""
+    codes = np.zeros(len(df), dtype=np.int64)
+    levels = []
+
+    for dim in dims:
+        column = df[dim]
+        if not isinstance(column.dtype, pd.CategoricalDtype):
+            column = column.astype('category')
+        # Missing labels get their own partition instead of a -1 code that
+        # would decode to a neighbouring partition's label
+        if column.isna().any():
+            if 'Missing' not in column.cat.categories:
+                column = column.cat.add_categories(['Missing'])
+            column = column.fillna('Missing')
+        dim_codes = column.cat.codes.to_numpy().astype(np.int64)
+        codes = codes * len(column.cat.categories) + dim_codes
+        levels.append(column.cat.categories)
+
+    # Compact the mixed-radix key so unused combinations take no space
+    keys, partition_ids = np.unique(codes, return_inverse=True)
+
+    # Decode each partition key back to its labels
+    labels = {}
+    remainder = keys
+    for dim, categories in reversed(list(zip(dims, levels))):
+        labels[dim] = np.asarray(categories)[remainder % len(categories)]
+        remainder = remainder // len(categories)
+
+    index = pd.MultiIndex.from_arrays([labels[dim] for dim in dims], names=dims) \
+        if len(dims) > 1 else pd.Index(labels[dims[0]], name=dims[0])
+
+    return partition_ids, index
+
+def compute_partition_stats(df, dims):
+    """Compute PnL, win rate and fee tables for every partition in one grouped pass"""
+    partition_ids, index = build_partition_index(df, dims)
+    n = len(index)
+
+    pnl = df['Closed PnL'].to_numpy(dtype=float)
+    volume = df['Size USD'].to_numpy(dtype=float)
+    fees = df['Fee'].to_numpy(dtype=float) if 'Fee' in df.columns else np.zeros(len(df))
+
+    partition_stats = pd.DataFrame({
+        'Total_PnL': np.bincount(partition_ids, weights=pnl, minlength=n),
+        'Trade_Count': np.bincount(partition_ids, minlength=n),
+        'Wins': np.bincount(partition_ids, weights=(pnl > 0).astype(float), minlength=n),
+        'Volume': np.bincount(partition_ids, weights=volume, minlength=n),
+        'Total_Fees': np.bincount(partition_ids, weights=fees, minlength=n)
+    }, index=index)
+
+    partition_stats['Avg_PnL'] = partition_stats['Total_PnL'] / partition_stats['Trade_Count']
+    partition_stats['Win_Rate'] = partition_stats.pop('Wins') / partition_stats['Trade_Count'] * 100
+    partition_stats['ROI'] = partition_stats['Total_PnL'] / partition_stats['Volume'].replace(0, np.nan) * 100
+    partition_stats['Net_PnL'] = partition_stats['Total_PnL'] - partition_stats['Total_Fees']
+
+    return partition_stats
+
+def top_k_partitions(partition_stats, metric, k=10, ascending=False):
+    """Select the top K partitions by a metric without sorting the whole table"""
+    values = partition_stats[metric].to_numpy(dtype=float)
+    values = values if ascending else -values
+    # Partitions without a value (e.g. ROI of zero volume) always rank last
+    values = np.where(np.isnan(values), np.inf, values)
+    k = min(k, len(values))
+
+    if k == 0:
+        return partition_stats.iloc[:0]
+
+    # argpartition finds the K best in linear time; only those K get sorted
+    candidates = np.argpartition(values, k - 1)[:k]
+    order = candidates[np.argsort(values[candidates], kind='stable')]
+
+    return partition_stats.iloc[order]
+
+def plot_partition_leaderboard(leaderboard, metric):
+    """Create top-K leaderboard chart"""
+    labels = [' / '.join(map(str, key)) if isinstance(key, tuple) else str(key)
+              for key in leaderboard.index]
+    # Shorten wallet addresses so bars stay readable
+    labels = [f"{label[:6]}…{label[-4:]}" if label.startswith('0x') and len(label) > 12 else label
+              for label in labels]
+
+    fig = go.Figure(
+        go.Bar(y=labels[::-1], x=leaderboard[metric].values[::-1], orientation='h',
+               marker_color=PURPLE_PALETTE[0],
+               hovertemplate='%{y}<br>' + metric + ': %{x:,.2f}<extra></extra>')
+    )
+
+    fig.update_layout(
+        height=max(300, 30 * len(labels) + 120),
+        title_text=f"Top {len(labels)} by {metric}",
+        title_x=0.5,
+        showlegend=False,
+        **create_plotly_theme()['layout']
+    )
+
+    return fig
+
+# Columns needed to replay fills into positions
+POSITION_COLUMNS = ['Size Tokens', 'Start Position']
+
+# Quantities below this many tokens are treated as flat
+POSITION_TOLERANCE = 1e-9
+
+def fill_times_hours(df):
+    """Fill timestamps in hours, from the raw ms Timestamp when available"""
+    if 'Timestamp' in df.columns:
+        return df['Timestamp'].to_numpy(dtype=float) / 3.6e6
+    # Convert through a Timedelta so the result does not depend on the index's unit
+    return np.asarray((pd.DatetimeIndex(df.index) - pd.Timestamp(0)) / pd.Timedelta(hours=1), dtype=float)
+
+def _segment_cumsum(values, segment_starts):
+    """Exclusive running sum that restarts at every segment start"""
+    running = np.cumsum(values) - values
+    offsets = np.maximum.accumulate(np.where(segment_starts, running, 0.0))
+    return running - offsets
+
+@st.cache_data(show_spinner=False)
+def reconstruct_fifo_positions(df):
+    """Replay fills per account and coin and match closes to opens FIFO"""
+    n = len(df)
+    dims = [col for col in PARTITION_COLUMNS if col in df.columns]
+    group_ids = build_partition_index(df, dims)[0] if dims else np.zeros(n, dtype=np.int64)
+    times = fill_times_hours(df)
+
+    # Replay order: partition, then time, then original row order
+    order = np.lexsort((np.arange(n), times, group_ids))
+    group_ids = group_ids[order]
+    times = times[order]
+    prices = df['Execution Price'].to_numpy(dtype=float)[order]
+    tokens = np.abs(df['Size Tokens'].to_numpy(dtype=float)[order])
+    delta = np.where(df['Side'].to_numpy()[order] == 'BUY', tokens, -tokens)
+
+    # Positions are rebuilt from each partition's first Start Position so the
+    # replay stays internally consistent even if fills are missing
+    group_first = np.r_[True, group_ids[1:] != group_ids[:-1]]
+    first_idx = np.flatnonzero(group_first)
+    group_of_fill = np.cumsum(group_first) - 1
+    start = df['Start Position'].to_numpy(dtype=float)[order][first_idx]
+    running = np.cumsum(delta)
+    pos_after = start[group_of_fill] + running - (running - delta)[first_idx][group_of_fill]
+    pos_before = pos_after - delta
+    pos_before[np.abs(pos_before) <= POSITION_TOLERANCE] = 0.0
+    pos_after[np.abs(pos_after) <= POSITION_TOLERANCE] = 0.0
+
+    # Split every fill into the part that reduces the position and the part that opens
+    reducing = np.sign(delta) == -np.sign(pos_before)
+    close_qty = np.where(reducing, np.minimum(tokens, np.abs(pos_before)), 0.0)
+    open_qty = tokens - close_qty
+    open_qty[open_qty <= POSITION_TOLERANCE] = 0.0
+
+    # An episode runs from flat (or a flip) until the position is flat again;
+    # inventory held before the first fill is carried in as an opening lot
+    starts_episode = (open_qty > 0) & ((pos_before == 0) | (np.sign(pos_after) == -np.sign(pos_before)))
+    carry_in = group_first & (pos_before != 0)
+    episode_after = np.cumsum(starts_episode.astype(np.int64) + carry_in) - 1
+    episode_before = episode_after - starts_episode
+
+    # Opening lots in FIFO order: carried-in inventory first, then each fill's open part
+    carry_idx = np.flatnonzero(carry_in)
+    open_idx = np.flatnonzero(open_qty > 0)
+    lot_episode = np.r_[episode_before[carry_idx], episode_after[open_idx]]
+    lot_rank = np.r_[carry_idx - 0.5, open_idx]
+    lot_order = np.lexsort((lot_rank, lot_episode))
+    lot_episode = lot_episode[lot_order]
+    lot_qty = np.r_[np.abs(pos_before[carry_idx]), open_qty[open_idx]][lot_order]
+    lot_price = np.r_[prices[carry_idx], prices[open_idx]][lot_order]
+    lot_time = np.r_[times[carry_idx], times[open_idx]][lot_order]
+    lot_sign = np.r_[np.sign(pos_before[carry_idx]), np.sign(pos_after[open_idx])][lot_order]
+
+    # Cumulative lot quantity locates matches; per-episode sums keep cost and
+    # entry-time totals small enough to difference without losing precision
+    lot_cum_end = np.cumsum(lot_qty)
+    lot_cum_start = lot_cum_end - lot_qty
+    episode_first_lot = np.r_[True, lot_episode[1:] != lot_episode[:-1]]
+    lot_cost_start = _segment_cumsum(lot_qty * lot_price, episode_first_lot)
+    time_origin = lot_time[episode_first_lot][np.cumsum(episode_first_lot) - 1]
+    lot_age_start = _segment_cumsum(lot_qty * (lot_time - time_origin), episode_first_lot)
+
+    n_episodes = int(max(episode_after.max(initial=-1), episode_before.max(initial=-1))) + 1
+    ep_first = np.full(n_episodes, -1)
+    ep_last = np.full(n_episodes, -1)
+    episode_last_lot = np.r_[episode_first_lot[1:], True]
+    ep_first[lot_episode[episode_first_lot]] = np.flatnonzero(episode_first_lot)
+    ep_last[lot_episode[episode_last_lot]] = np.flatnonzero(episode_last_lot)
+
+    def lot_integral(q, episodes, per_lot_start, per_lot_rate):
+        """Integrate a per-token lot attribute over the first q tokens of the episode"""
+        idx = np.clip(np.searchsorted(lot_cum_end, q, side='left'), ep_first[episodes], ep_last[episodes])
+        return per_lot_start[idx] + (q - lot_cum_start[idx]) * per_lot_rate[idx]
+
+    # Closes consume their episode's lots in order
+    close_idx = np.flatnonzero(close_qty > 0)
+    close_episode = episode_before[close_idx]
+    close_order = np.lexsort((close_idx, close_episode))
+    close_idx = close_idx[close_order]
+    close_episode = close_episode[close_order]
+    episode_first_close = np.r_[True, close_episode[1:] != close_episode[:-1]]
+    episode_base = lot_cum_start[ep_first[close_episode]]
+    episode_top = lot_cum_end[ep_last[close_episode]]
+    q0 = np.minimum(episode_base + _segment_cumsum(close_qty[close_idx], episode_first_close), episode_top)
+    q1 = np.minimum(q0 + close_qty[close_idx], episode_top)
+    matched = q1 - q0
+
+    entry_cost = (lot_integral(q1, close_episode, lot_cost_start, lot_price)
+                  - lot_integral(q0, close_episode, lot_cost_start, lot_price))
+    entry_age = (lot_integral(q1, close_episode, lot_age_start, lot_time - time_origin)
+                 - lot_integral(q0, close_episode, lot_age_start, lot_time - time_origin))
+    side_sign = lot_sign[ep_first[close_episode]]
+
+    realized = np.zeros(n)
+    holding = np.full(n, np.nan)
+    entry_price = np.full(n, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        realized[close_idx] = side_sign * (matched * prices[close_idx] - entry_cost)
+        entry_price[close_idx] = entry_cost / matched
+        holding[close_idx] = times[close_idx] - (time_origin[ep_first[close_episode]] + entry_age / matched)
+
+    fills = pd.DataFrame({
+        'Position_Before': pos_before,
+        'Position_After': pos_after,
+        'Close_Qty': close_qty,
+        'Open_Qty': open_qty,
+        'Entry_Price': entry_price,
+        'FIFO_PnL': realized,
+        'Holding_Hours': holding,
+        'Episode_Before': episode_before,
+        'Episode_After': episode_after,
+        'Exposure_USD': np.abs(pos_after) * prices
+    })
+
+    # Put results back in the caller's row order
+    fills = fills.iloc[np.argsort(order)]
+    fills.index = df.index
+
+    # Lots still open at the end of each partition are marked to the last fill price
+    last_idx = np.r_[first_idx[1:], n] - 1
+    last_episode = episode_after[last_idx]
+    has_lots = (pos_after[last_idx] != 0) & (ep_first[last_episode] >= 0)
+    last_idx = last_idx[has_lots]
+    last_episode = last_episode[has_lots]
+    remaining = np.abs(pos_after[last_idx])
+    episode_end = lot_cum_end[ep_last[last_episode]]
+    q_open = np.maximum(episode_end - remaining, lot_cum_start[ep_first[last_episode]])
+    remaining_cost = (lot_integral(episode_end, last_episode, lot_cost_start, lot_price)
+                      - lot_integral(q_open, last_episode, lot_cost_start, lot_price))
+    mark = prices[last_idx]
+
+    positions = pd.DataFrame({
+        'Position': pos_after[last_idx],
+        'Avg_Entry_Price': remaining_cost / (episode_end - q_open),
+        'Mark_Price': mark,
+        'Exposure_USD': remaining * mark,
+        'Unrealized_PnL': np.sign(pos_after[last_idx]) * (remaining * mark - remaining_cost)
+    })
+    if dims:
+        positions.index = build_partition_index(df, dims)[1][group_ids[last_idx]]
+
+    return fills, positions
+
+def summarize_positions_by_classification(df, fills):
+    """Summarize FIFO PnL, holding time and exposure by classification"""
+    grouped = fills.assign(
+        classification=df['classification'].values,
+        Closes=(fills['Close_Qty'] > 0).astype(int),
+        Weighted_Hours=fills['Holding_Hours'].fillna(0) * fills['Close_Qty']
+    ).groupby('classification')
+
+    summary = grouped.agg({
+        'FIFO_PnL': 'sum',
+        'Closes': 'sum',
+        'Close_Qty': 'sum',
+        'Weighted_Hours': 'sum',
+        'Exposure_USD': 'mean'
+    })
+    summary['Avg_Holding_Hours'] = summary.pop('Weighted_Hours') / summary.pop('Close_Qty').replace(0, np.nan)
+    summary['Median_Holding_Hours'] = grouped['Holding_Hours'].median()
+    summary = summary.rename(columns={'FIFO_PnL': 'Realized_PnL', 'Exposure_USD': 'Avg_Exposure_USD'})
+    summary['Exchange_PnL'] = df.groupby('classification')['Closed PnL'].sum()
+
+    return summary
+
+def plot_position_analysis(summary):
+    """Create FIFO position analysis by classification"""
+    fig = make_subplots(
+        rows=1, cols=3,
+        subplot_titles=('FIFO vs Exchange PnL', 'Avg Holding Time (hours)', 'Avg Exposure (USD)')
+    )
+
+    fig.add_trace(
+        go.Bar(x=summary.index, y=summary['Realized_PnL'], name='FIFO Realized',
+               marker_color=PURPLE_PALETTE[0]),
+        row=1, col=1
+    )
+    fig.add_trace(
+        go.Bar(x=summary.index, y=summary['Exchange_PnL'], name='Exchange Closed PnL',
+               marker_color=PURPLE_PALETTE[2]),
+        row=1, col=1
+    )
+
+    fig.add_trace(
+        go.Bar(x=summary.index, y=summary['Avg_Holding_Hours'], name='Avg Holding',
+               marker_color=PURPLE_PALETTE[1], showlegend=False),
+        row=1, col=2
+    )
+
+    fig.add_trace(
+        go.Bar(x=summary.index, y=summary['Avg_Exposure_USD'], name='Avg Exposure',
+               marker_color=PURPLE_PALETTE[5], showlegend=False),
+        row=1, col=3
+    )
+
+    fig.update_layout(
+        height=450,
+        title_text="FIFO Position Analysis by Classification",
+        title_x=0.5,
+        **create_plotly_theme()['layout']
+    )
+
+    return fig
+
+def build_round_trips(df, fills):
+    """Pair opens with closes into one round trip per position episode"""
+    n = len(df)
+    dims = [col for col in PARTITION_COLUMNS if col in df.columns]
+    times = fill_times_hours(df)
+    tokens = np.abs(df['Size Tokens'].to_numpy(dtype=float))
+    fees = df['Fee'].to_numpy(dtype=float) if 'Fee' in df.columns else np.zeros(n)
+    pos_before = fills['Position_Before'].to_numpy()
+    pos_after = fills['Position_After'].to_numpy()
+    open_qty = fills['Open_Qty'].to_numpy()
+    close_qty = fills['Close_Qty'].to_numpy()
+
+    # A flip fill appears twice: closing the old episode and opening the next
+    open_rows = np.flatnonzero(open_qty > 0)
+    close_rows = np.flatnonzero(close_qty > 0)
+    rows = np.r_[close_rows, open_rows]
+    is_close = np.r_[np.ones(len(close_rows), dtype=bool), np.zeros(len(open_rows), dtype=bool)]
+    episodes = np.r_[fills['Episode_Before'].to_numpy()[close_rows], fills['Episode_After'].to_numpy()[open_rows]]
+
+    # Sort once by episode then replay order; every aggregate below is a grouped reduction
+    event_order = np.lexsort((~is_close, rows, times[rows], episodes))
+    rows = rows[event_order]
+    is_close = is_close[event_order]
+    episodes = episodes[event_order]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fee_share = np.where(is_close, close_qty[rows], open_qty[rows]) / tokens[rows]
+    events = pd.DataFrame({
+        'Episode': episodes,
+        'Time': times[rows],
+        'Classification': df['classification'].to_numpy()[rows],
+        'Is_Close': is_close,
+        'Open_Qty': np.where(is_close, 0.0, open_qty[rows]),
+        'Close_Qty': np.where(is_close, close_qty[rows], 0.0),
+        'Realized_PnL': np.where(is_close, fills['FIFO_PnL'].to_numpy()[rows], 0.0),
+        'Exchange_PnL': np.where(is_close, df['Closed PnL'].to_numpy(dtype=float)[rows], 0.0),
+        'Fees': fees[rows] * np.nan_to_num(fee_share),
+        'Sign': np.where(is_close, np.sign(pos_before[rows]), np.sign(pos_after[rows])),
+        'Carried_In': is_close | ((pos_before[rows] != 0) & (np.sign(pos_before[rows]) == np.sign(pos_after[rows]))),
+        'Closes_Out': is_close & ((pos_after[rows] == 0) | (np.sign(pos_after[rows]) == -np.sign(pos_before[rows])))
+    })
+    for dim in dims:
+        events[dim] = df[dim].to_numpy()[rows]
+
+    grouped = events.groupby('Episode', sort=False)
+    round_trips = grouped.agg(
+        Entry_Hours=('Time', 'first'),
+        Entry_Classification=('Classification', 'first'),
+        Sign=('Sign', 'first'),
+        Carried_In=('Carried_In', 'first'),
+        Fills=('Time', 'size'),
+        Opened_Qty=('Open_Qty', 'sum'),
+        Closed_Qty=('Close_Qty', 'sum'),
+        Realized_PnL=('Realized_PnL', 'sum'),
+        Exchange_PnL=('Exchange_PnL', 'sum'),
+        Fees=('Fees', 'sum'),
+        Closed=('Closes_Out', 'any'),
+        **{dim: (dim, 'first') for dim in dims}
+    )
+
+    # Exit is the last close of the episode
+    exits = events[events['Is_Close']].groupby('Episode', sort=False).agg(
+        Exit_Hours=('Time', 'last'),
+        Exit_Classification=('Classification', 'last')
+    )
+    round_trips = round_trips.join(exits)
+
+    round_trips['Side'] = np.where(round_trips.pop('Sign') > 0, 'Long', 'Short')
+    round_trips['Status'] = np.where(round_trips.pop('Closed'), 'Closed', 'Open')
+    round_trips.loc[round_trips['Status'] == 'Open', ['Exit_Hours', 'Exit_Classification']] = np.nan
+    round_trips['Holding_Hours'] = round_trips['Exit_Hours'] - round_trips['Entry_Hours']
+    round_trips['Entry_Time'] = pd.to_datetime(np.rint(round_trips.pop('Entry_Hours') * 3.6e6), unit='ms')
+    round_trips['Exit_Time'] = pd.to_datetime(np.rint(round_trips.pop('Exit_Hours') * 3.6e6), unit='ms')
+    round_trips['Net_PnL'] = round_trips['Realized_PnL'] - round_trips['Fees']
+
+    columns = dims + ['Side', 'Status', 'Carried_In', 'Entry_Time', 'Exit_Time', 'Holding_Hours',
+                      'Entry_Classification', 'Exit_Classification', 'Fills', 'Opened_Qty', 'Closed_Qty',
+                      'Realized_PnL', 'Exchange_PnL', 'Fees', 'Net_PnL']
+    round_trips = round_trips[columns]
+    round_trips.index.name = 'Round_Trip'
+
+    return round_trips
+
+def summarize_sentiment_transitions(round_trips):
+    """Entry x exit classification matrices for closed round trips"""
+    closed = round_trips[(round_trips['Status'] == 'Closed') & ~round_trips['Carried_In']]
+    grouped = closed.groupby(['Entry_Classification', 'Exit_Classification'])
+
+    return {
+        'Count': grouped.size().unstack(fill_value=0),
+        'Avg_PnL': grouped['Net_PnL'].mean().unstack(),
+        'Win_Rate': grouped['Net_PnL'].apply(lambda x: (x > 0).mean() * 100).unstack(),
+        'Median_Holding_Hours': grouped['Holding_Hours'].median().unstack()
+    }
+
+def plot_lifecycle_analysis(round_trips, transitions):
+    """Create trade lifecycle analysis"""
+    closed = round_trips[round_trips['Status'] == 'Closed']
+
+    fig = make_subplots(
+        rows=2, cols=2,
+        subplot_titles=('Holding Time Distribution (hours)', 'PnL per Round Trip',
+                       'Round Trips: Entry vs Exit Sentiment', 'Avg PnL: Entry vs Exit Sentiment'),
+        specs=[[{"secondary_y": False}, {"secondary_y": False}],
+               [{"type": "heatmap"}, {"type": "heatmap"}]]
+    )
+
+    for i, side in enumerate(['Long', 'Short']):
+        subset = closed[closed['Side'] == side]
+        fig.add_trace(
+            go.Histogram(x=np.log10(subset['Holding_Hours'].clip(lower=1 / 60)), name=side,
+                         marker_color=['#10b981', '#ef4444'][i], opacity=0.7, nbinsx=50),
+            row=1, col=1
+        )
+        fig.add_trace(
+            go.Box(y=subset['Net_PnL'], name=side, marker_color=['#10b981', '#ef4444'][i], showlegend=False),
+            row=1, col=2
+        )
+
+    fig.add_trace(
+        go.Heatmap(
+            z=transitions['Count'].values,
+            x=transitions['Count'].columns,
+            y=transitions['Count'].index,
+            colorscale='Viridis',
+            showscale=False,
+            text=transitions['Count'].values,
+            texttemplate='%{text}'
+        ),
+        row=2, col=1
+    )
+
+    fig.add_trace(
+        go.Heatmap(
+            z=transitions['Avg_PnL'].values,
+            x=transitions['Avg_PnL'].columns,
+            y=transitions['Avg_PnL'].index,
+            colorscale='RdYlGn',
+            showscale=True
+        ),
+        row=2, col=2
+    )
+
+    fig.update_layout(
+        height=700,
+        title_text="Trade Lifecycle Analysis",
+        title_x=0.5,
+        barmode='overlay',
+        **create_plotly_theme()['layout']
+    )
+    fig.update_xaxes(title_text='log10(hours)', row=1, col=1)
+    fig.update_xaxes(title_text='Exit', row=2, col=1)
+    fig.update_yaxes(title_text='Entry', row=2, col=1)
+    fig.update_xaxes(title_text='Exit', row=2, col=2)
+
+    return fig
+
+# Fills in the same coin and minute form each other's reference price
+COST_BUCKET_MS = 60_000
+COST_DIMENSIONS = ['Order Type', 'Side', 'classification', 'Size Bucket']
+
+@st.cache_data(show_spinner=False)
+def compute_execution_costs(df, bucket_ms=COST_BUCKET_MS):
+    """Compute fee, slippage and effective cost in basis points for every fill"""
+    price = df['Execution Price'].to_numpy(dtype=float)
+    notional = df['Size USD'].to_numpy(dtype=float)
+    tokens = np.abs(df['Size Tokens'].to_numpy(dtype=float)) if 'Size Tokens' in df.columns else notional / price
+
+    # Dense id per (coin, time bucket), so the join is a bincount instead of a merge
+    bucket_keys = df['Timestamp'].to_numpy(dtype=np.int64) // bucket_ms
+    bucket_keys = bucket_keys - bucket_keys.min()
+    if 'Coin' in df.columns:
+        coin_codes, _ = build_partition_index(df, ['Coin'])
+        bucket_keys = coin_codes * (bucket_keys.max() + 1) + bucket_keys
+    _, bucket_ids = np.unique(bucket_keys, return_inverse=True)
+
+    # Reference is the VWAP of the other fills in the bucket; a lone fill has none
+    peer_count = np.bincount(bucket_ids)[bucket_ids] - 1
+    peer_notional = np.bincount(bucket_ids, weights=notional)[bucket_ids] - notional
+    peer_tokens = np.bincount(bucket_ids, weights=tokens)[bucket_ids] - tokens
+    has_reference = (peer_count > 0) & (peer_tokens > POSITION_TOLERANCE)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        reference = np.where(has_reference, peer_notional / peer_tokens, np.nan)
+        side_sign = np.where(df['Side'].to_numpy() == 'BUY', 1.0, -1.0)
+        slippage_bps = side_sign * (price - reference) / reference * 1e4
+        fee_bps = df['Fee'].to_numpy(dtype=float) / notional * 1e4
+
+    return pd.DataFrame({
+        'Order Type': np.where(df['Crossed'].to_numpy(dtype=bool), 'Market', 'Limit'),
+        'Side': df['Side'].to_numpy(),
+        'classification': df['classification'].to_numpy(),
+        'Size Bucket': size_buckets(notional),
+        'Notional': notional,
+        'Reference_Price': reference,
+        'Fee_bps': fee_bps,
+        'Slippage_bps': slippage_bps,
+        'Effective_bps': fee_bps + slippage_bps
+    }, index=df.index)
+
+def summarize_execution_costs(costs, dims):
+    """Volume-weighted fee, slippage and effective cost per group in one grouped pass"""
+    group_ids, index = build_partition_index(costs, dims)
+    n = len(index)
+
+    notional = costs['Notional'].to_numpy(dtype=float)
+    fee_bps = np.nan_to_num(costs['Fee_bps'].to_numpy(dtype=float))
+    slippage_bps = costs['Slippage_bps'].to_numpy(dtype=float)
+    referenced = ~np.isnan(slippage_bps)
+
+    volume = np.bincount(group_ids, weights=notional, minlength=n)
+    referenced_volume = np.bincount(group_ids, weights=notional * referenced, minlength=n)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        summary = pd.DataFrame({
+            'Fills': np.bincount(group_ids, minlength=n),
+            'Volume': volume,
+            'Fee_bps': np.bincount(group_ids, weights=fee_bps * notional, minlength=n) / volume,
+            'Slippage_bps': np.bincount(group_ids, weights=np.where(referenced, slippage_bps * notional, 0.0),
+                                        minlength=n) / referenced_volume,
+            'Coverage': referenced_volume / volume * 100
+        }, index=index)
+    summary['Effective_bps'] = summary['Fee_bps'] + summary['Slippage_bps']
+
+    return summary
+
+def plot_execution_costs(summaries):
+    """Create fee and slippage breakdowns for each cost dimension"""
+    fig = make_subplots(
+        rows=2, cols=2,
+        subplot_titles=[f'Cost by {dim} (bps)' for dim in summaries]
+    )
+
+    for i, (dim, summary) in enumerate(summaries.items()):
+        row, col = i // 2 + 1, i % 2 + 1
+        labels = summary.index.astype(str)
+        fig.add_trace(
+            go.Bar(x=labels, y=summary['Fee_bps'], name='Fee',
+                   marker_color=PURPLE_PALETTE[0], showlegend=i == 0, legendgroup='fee'),
+            row=row, col=col
+        )
+        fig.add_trace(
+            go.Bar(x=labels, y=summary['Slippage_bps'], name='Slippage',
+                   marker_color=PURPLE_PALETTE[2], showlegend=i == 0, legendgroup='slippage'),
+            row=row, col=col
+        )
+
+    fig.update_layout(
+        height=700,
+        barmode='relative',
+        title_text="Execution Cost Analysis",
+        title_x=0.5,
+        **create_plotly_theme()['layout']
+    )
+
+    return fig
+
+# Daily PnL risk, annualized on calendar days since crypto trades every day
+RISK_PERIODS_PER_YEAR = 365
+RISK_CONFIDENCE = 0.95
+DIRECTION_STRATEGIES = {
+    'Open Long': 'Long', 'Close Long': 'Long', 'Buy': 'Long',
+    'Open Short': 'Short', 'Close Short': 'Short', 'Sell': 'Short'
+}
+
+def build_daily_pnl_matrix(df, groups):
+    """Daily PnL with one column per group, NaN on days the group did not trade"""
+    keys = pd.DataFrame({'Day': pd.DatetimeIndex(df.index).normalize(), 'Group': np.asarray(groups)})
+    day_ids, days = build_partition_index(keys, ['Day'])
+    group_ids, group_index = build_partition_index(keys, ['Group'])
+
+    cells = day_ids * len(group_index) + group_ids
+    size = len(days) * len(group_index)
+    pnl = np.bincount(cells, weights=df['Closed PnL'].to_numpy(dtype=float), minlength=size)
+    traded = np.bincount(cells, minlength=size) > 0
+
+    matrix = np.where(traded, pnl, np.nan).reshape(len(days), len(group_index))
+    return pd.DataFrame(matrix, index=days, columns=group_index.rename(None))
+
+def compute_risk_metrics(daily_pnl, confidence=RISK_CONFIDENCE):
+    """Drawdown, Sharpe, Sortino, VaR, CVaR and tail ratio for every column of a daily PnL matrix"""
+    values = daily_pnl.to_numpy(dtype=float)
+    active_days = (~np.isnan(values)).sum(axis=0)
+
+    # Equity starts flat, so a group that only loses still shows its drawdown
+    equity = np.cumsum(np.nan_to_num(values), axis=0)
+    peak = np.maximum.accumulate(np.maximum(equity, 0), axis=0)
+    max_drawdown = (peak - equity).max(axis=0, initial=0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.nanmean(values, axis=0)
+        std = np.nanstd(values, axis=0, ddof=1)
+        downside = np.sqrt(np.nansum(np.minimum(values, 0) ** 2, axis=0) / active_days)
+        lower, upper = np.nanquantile(values, [1 - confidence, confidence], axis=0)
+        in_tail = values <= lower
+        tail_mean = np.where(in_tail, values, 0).sum(axis=0) / in_tail.sum(axis=0)
+
+        risk = pd.DataFrame({
+            'active_days': active_days,
+            'max_drawdown': max_drawdown,
+            'sharpe': mean / std * np.sqrt(RISK_PERIODS_PER_YEAR),
+            'sortino': mean / downside * np.sqrt(RISK_PERIODS_PER_YEAR),
+            f'var_{confidence * 100:.0f}': -lower,
+            f'cvar_{confidence * 100:.0f}': -tail_mean,
+            'tail_ratio': upper / np.abs(lower)
+        }, index=daily_pnl.columns)
+
+    return risk.replace([np.inf, -np.inf], np.nan)
+
+# Outlier flags: one bit per scored column in a per-fill bitmap
+OUTLIER_BITS = {'Execution Price': 1, 'Size USD': 2, 'Closed PnL': 4}
+OUTLIER_THRESHOLD = 3.5
+OUTLIER_MIN_FILLS = 5
+
+def compute_outlier_flags(df, threshold=OUTLIER_THRESHOLD, min_fills=OUTLIER_MIN_FILLS):
+    """Flag fills whose robust z-score against their coin's fills that day exceeds the threshold"""
+    dims = ['Coin'] if 'Coin' in df.columns else []
+    keys = pd.DataFrame({'Day': pd.DatetimeIndex(df.index).normalize(),
+                         **{dim: df[dim].to_numpy() for dim in dims}})
+    window_ids = build_partition_index(keys, dims + ['Day'])[0]
+    coin_ids = build_partition_index(keys, dims)[0] if dims else np.zeros(len(df), dtype=np.int64)
+
+    values = df[list(OUTLIER_BITS)].to_numpy(dtype=float, copy=True)
+    # Sizes are scored on a log scale since they span orders of magnitude;
+    # only fills that realized PnL are scored on it, as opening fills sit at zero
+    size_column = list(OUTLIER_BITS).index('Size USD')
+    pnl_column = list(OUTLIER_BITS).index('Closed PnL')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values[:, size_column] = np.where(values[:, size_column] > 0, np.log(values[:, size_column]), np.nan)
+    values[values[:, pnl_column] == 0, pnl_column] = np.nan
+
+    def robust_scores(group_ids):
+        """Absolute deviation from the group median and its robust scale"""
+        median = pd.DataFrame(values).groupby(group_ids).transform('median').to_numpy()
+        deviation = np.abs(values - median)
+        grouped_deviation = pd.DataFrame(deviation).groupby(group_ids)
+        mad = grouped_deviation.transform('median').to_numpy()
+        mean_deviation = grouped_deviation.transform('mean').to_numpy()
+        # Modified z-score; when most values tie the MAD is zero, so fall back to the mean absolute deviation
+        return deviation, np.where(mad > 0, mad / 0.6745, mean_deviation * 1.253314)
+
+    # Thin coin-days are scored against the coin's statistics over all of its fills
+    thin = (np.bincount(window_ids)[window_ids] < min_fills)[:, None]
+    window_deviation, window_scale = robust_scores(window_ids)
+    coin_deviation, coin_scale = robust_scores(coin_ids)
+    deviation = np.where(thin, coin_deviation, window_deviation)
+    scale = np.where(thin, coin_scale, window_scale)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        outlying = np.nan_to_num(deviation / scale, nan=0.0, posinf=0.0) > threshold
+
+    return (outlying * np.array(list(OUTLIER_BITS.values()))).sum(axis=1).astype(np.uint8)
+
+def summarize_outliers(df, flags):
+    """Flagged fill counts per column and classification"""
+    summary = pd.DataFrame({
+        column: pd.Series((flags & bit) > 0, index=df.index).groupby(df['classification'].to_numpy()).sum()
+        for column, bit in OUTLIER_BITS.items()
+    })
+    summary['Any'] = pd.Series(flags > 0).groupby(df['classification'].to_numpy()).sum()
+    summary['Fills'] = df.groupby(df['classification'].to_numpy()).size()
+    summary['Flagged_Pct'] = summary['Any'] / summary['Fills'] * 100
+    return summary
+
+# Pivot tensor: additive measures over every categorical dimension, kept only for observed cells
+PIVOT_MEASURES = {
+    'Trades': lambda cells: cells['Trades'],
+    'Total PnL': lambda cells: cells['PnL'],
+    'Avg PnL': lambda cells: cells['PnL'] / cells['Trades'],
+    'PnL Std': lambda cells: np.sqrt(np.maximum(
+        (cells['PnL_Sq'] - cells['PnL'] ** 2 / cells['Trades']) / (cells['Trades'] - 1).replace(0, np.nan), 0)),
+    'Win Rate (%)': lambda cells: cells['Wins'] / cells['Trades'] * 100,
+    'Volume': lambda cells: cells['Volume'],
+    'ROI (%)': lambda cells: cells['PnL'] / cells['Volume'].replace(0, np.nan) * 100,
+    'Avg Fee': lambda cells: cells['Fees'] / cells['Trades'],
+    'Fee (bps)': lambda cells: cells['Fees'] / cells['Volume'].replace(0, np.nan) * 1e4
+}
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Low-cardinality dimensions make up the shared tensor. Each high-cardinality
+# one, keyed to the column it needs, is only added to a cube built on demand,
+# so the shared tensor stays far smaller than the trade log
+PIVOT_BASE_DIMS = ['classification', 'Side', 'Order Type', 'Direction', 'Day of Week', 'Size Bucket']
+PIVOT_DETAIL_DIMS = {'Index Value': 'value', 'Coin': 'Coin', 'Hour (UTC)': 'Timestamp'}
+
+def pivot_dimension_names(columns):
+    """Every pivot dimension available for a dataset with these columns"""
+    return PIVOT_BASE_DIMS + [dim for dim, column in PIVOT_DETAIL_DIMS.items() if column in columns]
+
+def pivot_dimensions(df, detail_dims=()):
+    """Categorical dimensions a pivot tensor is built over: the base ones plus any requested detail ones"""
+    dims = {
+        'classification': df['classification'].to_numpy(),
+        'Side': df['Side'].to_numpy(),
+        'Order Type': np.where(df['Crossed'].to_numpy(dtype=bool), 'Market Order', 'Limit Order'),
+        'Direction': df['Direction'].to_numpy(),
+        'Day of Week': pd.Categorical.from_codes(pd.DatetimeIndex(df.index).dayofweek, WEEKDAYS),
+        'Size Bucket': size_buckets(df['Size USD'])
+    }
+    if 'Index Value' in detail_dims:
+        dims['Index Value'] = df['value'].to_numpy()
+    if 'Coin' in detail_dims:
+        dims['Coin'] = df['Coin'].to_numpy()
+    if 'Hour (UTC)' in detail_dims:
+        dims['Hour (UTC)'] = (df['Timestamp'].to_numpy(dtype=np.int64) // 3_600_000) % 24
+    return dims
+
+class PivotTensor:
+    """Sparse tensor of additive trade measures; any 2D breakdown is a reduction of it"""
+
+    def __init__(self, levels, coords, sums):
+        self.dims = list(levels)
+        self.levels = levels
+        self.coords = coords
+        self.sums = sums
+
+    def reduce(self, dims):
+        """Sum the tensor down to the given dimensions, keeping observed combinations only"""
+        keys = np.zeros(len(self.sums['Trades']), dtype=np.int64)
+        for dim in dims:
+            keys = keys * len(self.levels[dim]) + self.coords[dim]
+        cells, cell_ids = np.unique(keys, return_inverse=True)
+
+        reduced = pd.DataFrame({
+            name: np.bincount(cell_ids, weights=values, minlength=len(cells))
+            for name, values in self.sums.items()
+        })
+
+        # Decode each reduced cell back to its labels
+        labels = []
+        for dim in reversed(dims):
+            size = len(self.levels[dim])
+            labels.append(pd.Categorical.from_codes(cells % size, self.levels[dim]))
+            cells = cells // size
+        reduced.index = pd.MultiIndex.from_arrays(labels[::-1], names=dims) if len(dims) > 1 else \
+            pd.CategoricalIndex(labels[0], name=dims[0])
+
+        return reduced
+
+    def pivot(self, rows, columns, measure):
+        """Matrix of one measure with one dimension on each axis"""
+        return PIVOT_MEASURES[measure](self.reduce([rows, columns])).unstack(columns)
+
+@st.cache_data(show_spinner=False)
+def build_pivot_tensor(df, detail_dims=()):
+    """Aggregate additive measures for every observed combination of pivot dimensions in one pass"""
+    levels = {}
+    codes = {}
+    keys = np.zeros(len(df), dtype=np.int64)
+    for dim, values in pivot_dimensions(df, detail_dims).items():
+        column = values if isinstance(values, pd.Categorical) else pd.Categorical(values)
+        if (column.codes < 0).any():
+            column = column.add_categories(['Missing']).fillna('Missing')
+        levels[dim] = column.categories
+        codes[dim] = column.codes.astype(np.int64)
+        keys = keys * len(column.categories) + codes[dim]
+
+    # Only observed cells are kept; each cell remembers its code along every dimension
+    cells, cell_ids = np.unique(keys, return_inverse=True)
+    n = len(cells)
+    first_row = np.zeros(n, dtype=np.int64)
+    first_row[cell_ids[::-1]] = np.arange(len(df))[::-1]
+    coords = {dim: dim_codes[first_row] for dim, dim_codes in codes.items()}
+
+    pnl = df['Closed PnL'].to_numpy(dtype=float)
+    sums = {
+        'Trades': np.bincount(cell_ids, minlength=n).astype(float),
+        'Wins': np.bincount(cell_ids, weights=(pnl > 0).astype(float), minlength=n),
+        'PnL': np.bincount(cell_ids, weights=pnl, minlength=n),
+        'PnL_Sq': np.bincount(cell_ids, weights=pnl * pnl, minlength=n),
+        'Volume': np.bincount(cell_ids, weights=df['Size USD'].to_numpy(dtype=float), minlength=n),
+        'Fees': np.bincount(cell_ids, weights=df['Fee'].to_numpy(dtype=float) if 'Fee' in df.columns
+                            else np.zeros(len(df)), minlength=n)
+    }
+
+    return PivotTensor(levels, coords, sums)
+
+def plot_pivot_heatmap(matrix, measure):
+    """Create a heatmap of one measure across two dimensions"""
+    diverging = measure in ('Total PnL', 'Avg PnL', 'ROI (%)')
+    fig = go.Figure(go.Heatmap(
+        z=matrix.values,
+        x=matrix.columns.astype(str),
+        y=matrix.index.astype(str),
+        colorscale='RdYlGn' if diverging else 'Purples',
+        zmid=0 if diverging else None,
+        hovertemplate=f"{matrix.index.name}: %{{y}}<br>{matrix.columns.name}: %{{x}}<br>{measure}: %{{z:,.4f}}<extra></extra>"
+    ))
+
+    fig.update_layout(
+        height=max(400, 28 * len(matrix.index) + 150),
+        title_text=f"{measure} by {matrix.index.name} and {matrix.columns.name}",
+        title_x=0.5,
+        **create_plotly_theme()['layout']
+    )
+    fig.update_xaxes(title_text=matrix.columns.name)
+    fig.update_yaxes(title_text=matrix.index.name)
+
+    return fig
+
+# Significance tests between groups of trades
+SIGNIFICANCE_LEVEL = 0.05
+PERMUTATIONS = 2000
+# Relabelling masks are built this many cells (permutations x trades) at a time
+PERMUTATION_CHUNK_CELLS = 1 << 22
+# Smaller groups than 1/50 of the pooled trades draw their indices directly
+PERMUTATION_SPARSE_RATIO = 50
+SIGNIFICANCE_GROUPINGS = {
+    'Classification': lambda df: df['classification'].to_numpy(),
+    'Order Type': lambda df: np.where(df['Crossed'].to_numpy(dtype=bool), 'Market Order', 'Limit Order'),
+    'Direction': lambda df: df['Direction'].map(DIRECTION_STRATEGIES).to_numpy()
+}
+P_VALUE_CORRECTIONS = ['Holm', 'Benjamini-Hochberg']
+
+def _normal_two_sided(z):
+    return math.erfc(abs(z) / math.sqrt(2)) if np.isfinite(z) else np.nan
+
+def _betainc(a, b, x):
+    """Regularized incomplete beta function by continued fraction"""
+    if x <= 0 or x >= 1:
+        return float(x >= 1)
+    if x > (a + 1) / (a + b + 2):
+        return 1 - _betainc(b, a, 1 - x)
+
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log1p(-x)) / a
+    tiny = 1e-300
+    c, d = 1.0, 1 - (a + b) * x / (a + 1)
+    d = 1 / (d if abs(d) > tiny else tiny)
+    result = d
+    for m in range(1, 300):
+        for numerator in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                          -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1 + numerator * d
+            d = 1 / (d if abs(d) > tiny else tiny)
+            c = 1 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            result *= c * d
+        if abs(c * d - 1) < 1e-12:
+            break
+    return front * result
+
+def _student_two_sided(t, dof):
+    if not (np.isfinite(t) and np.isfinite(dof)) or dof <= 0:
+        return np.nan
+    return _betainc(dof / 2, 0.5, dof / (dof + t * t))
+
+def proportion_test(wins_a, n_a, wins_b, n_b):
+    """Two-proportion z-test; returns (z, two-sided p)"""
+    pooled = (wins_a + wins_b) / (n_a + n_b)
+    se = math.sqrt(pooled * (1 - pooled) * (1 / n_a + 1 / n_b))
+    z = (wins_a / n_a - wins_b / n_b) / se if se > 0 else np.nan
+    return z, _normal_two_sided(z)
+
+def welch_test(a, b):
+    """Welch's unequal-variance t-test; returns (t, two-sided p)"""
+    var_a, var_b = a.var(ddof=1) / len(a), b.var(ddof=1) / len(b)
+    se = math.sqrt(var_a + var_b)
+    if se == 0:
+        return np.nan, np.nan
+    t = (a.mean() - b.mean()) / se
+    dof = (var_a + var_b) ** 2 / (var_a ** 2 / (len(a) - 1) + var_b ** 2 / (len(b) - 1))
+    return t, _student_two_sided(t, dof)
+
+def mann_whitney_test(a, b):
+    """Mann-Whitney U test with tie correction and normal approximation; returns (U, two-sided p)"""
+    n_a, n_b = len(a), len(b)
+    n = n_a + n_b
+    pooled = np.concatenate([a, b])
+    ranks = pd.Series(pooled).rank(method='average').to_numpy()
+    u = ranks[:n_a].sum() - n_a * (n_a + 1) / 2
+
+    _, ties = np.unique(pooled, return_counts=True)
+    tie_term = (ties ** 3 - ties).sum() / (n * (n - 1))
+    sigma = math.sqrt(n_a * n_b / 12 * ((n + 1) - tie_term))
+    if sigma == 0:
+        return u, np.nan
+    z = (u - n_a * n_b / 2 - math.copysign(0.5, u - n_a * n_b / 2)) / sigma
+    return u, _normal_two_sided(z)
+
+def permutation_test(a, b, permutations=PERMUTATIONS, seed=0):
+    """Two-sided Monte Carlo permutation test on the difference in means, with relabellings drawn in chunks"""
+    pooled = np.concatenate([a, b])
+    n, n_a, n_b = len(pooled), len(a), len(b)
+    total = pooled.sum()
+    observed = a.sum() / n_a - (total - a.sum()) / n_b
+
+    # Each relabelling is a uniformly random subset of the smaller group's size:
+    # the k smallest of n random keys. Its sum comes from a matrix product of
+    # the 0/1 masks with the pooled values
+    k = min(n_a, n_b)
+    rng = np.random.default_rng(seed)
+    if k * PERMUTATION_SPARSE_RATIO <= n:
+        # A small group only needs its k indices per relabelling, not n keys
+        sum_a = np.array([pooled[rng.choice(n, k, replace=False)].sum() for _ in range(permutations)])
+    else:
+        chunk = max(1, PERMUTATION_CHUNK_CELLS // n)
+        subset_sums = []
+        for done in range(0, permutations, chunk):
+            keys = rng.random((min(chunk, permutations - done), n))
+            kth = np.partition(keys, k - 1, axis=1)[:, k - 1:k]
+            subset_sums.append((keys <= kth).astype(float) @ pooled)
+        sum_a = np.concatenate(subset_sums)
+    if n_a > n_b:
+        sum_a = total - sum_a
+
+    differences = sum_a / n_a - (total - sum_a) / n_b
+    # Relabellings that tie the observed statistic count as at least as extreme despite rounding
+    tolerance = 1e-12 * max(abs(observed), np.abs(pooled).max() / min(n_a, n_b))
+    return observed, (1 + np.sum(np.abs(differences) >= abs(observed) - tolerance)) / (permutations + 1)
+
+def adjust_p_values(p_values, method='Holm'):
+    """Correct a family of p-values for multiple comparisons; NaNs are left out"""
+    p_values = np.asarray(p_values, dtype=float)
+    adjusted = np.full(len(p_values), np.nan)
+    valid = np.flatnonzero(~np.isnan(p_values))
+    m = len(valid)
+    if m == 0:
+        return adjusted
+
+    order = valid[np.argsort(p_values[valid], kind='stable')]
+    ranked = p_values[order]
+    if method == 'Holm':
+        corrected = np.maximum.accumulate((m - np.arange(m)) * ranked)
+    elif method == 'Benjamini-Hochberg':
+        corrected = np.minimum.accumulate((m / np.arange(1, m + 1) * ranked)[::-1])[::-1]
+    else:
+        raise ValueError(f"Unknown correction: {method}")
+    adjusted[order] = np.minimum(corrected, 1)
+    return adjusted
+
+@st.cache_data(show_spinner=False)
+def compute_significance_tests(df, grouping='Classification', correction='Holm', permutations=PERMUTATIONS):
+    """Pairwise win-rate and PnL tests between the groups of a grouping, corrected per test family.
+
+    With permutations=0 only the analytic tests run, leaving out the permutation columns.
+    """
+    labels = SIGNIFICANCE_GROUPINGS[grouping](df)
+    pnl = df['Closed PnL'].to_numpy(dtype=float)
+    group_pnl = {label: pnl[labels == label] for label in pd.unique(labels[pd.notna(labels)])}
+    group_pnl = {label: values for label, values in sorted(group_pnl.items()) if len(values) >= 2}
+
+    rows = []
+    for i, (label_a, a) in enumerate(group_pnl.items()):
+        for label_b, b in list(group_pnl.items())[i + 1:]:
+            wins_a, wins_b = (a > 0).sum(), (b > 0).sum()
+            _, proportion_p = proportion_test(wins_a, len(a), wins_b, len(b))
+            _, welch_p = welch_test(a, b)
+            _, mann_whitney_p = mann_whitney_test(a, b)
+            rows.append({
+                'Group_A': label_a, 'Group_B': label_b,
+                'Trades_A': len(a), 'Trades_B': len(b),
+                'Win_Rate_A': wins_a / len(a) * 100, 'Win_Rate_B': wins_b / len(b) * 100,
+                'Avg_PnL_A': a.mean(), 'Avg_PnL_B': b.mean(),
+                'Win_Rate_p': proportion_p, 'Welch_p': welch_p, 'Mann_Whitney_p': mann_whitney_p
+            })
+            if permutations:
+                rows[-1]['Permutation_p'] = permutation_test(a, b, permutations)[1]
+
+    p_columns = ['Win_Rate_p', 'Welch_p', 'Mann_Whitney_p'] + (['Permutation_p'] if permutations else [])
+    tests = pd.DataFrame(rows, columns=['Group_A', 'Group_B', 'Trades_A', 'Trades_B', 'Win_Rate_A', 'Win_Rate_B',
+                                        'Avg_PnL_A', 'Avg_PnL_B'] + p_columns)
+    for column in p_columns:
+        tests[column.replace('_p', '_adj_p')] = adjust_p_values(tests[column], correction)
+
+    return tests.set_index(['Group_A', 'Group_B'])
+
+def plot_significance_tests(tests):
+    """Create adjusted p-values per pair and test on a -log10 scale"""
+    fig = go.Figure()
+    pairs = [f"{a} vs {b}" for a, b in tests.index]
+
+    for i, (column, name) in enumerate([('Win_Rate_adj_p', 'Win Rate (z-test)'), ('Welch_adj_p', 'Mean PnL (Welch)'),
+                                        ('Mann_Whitney_adj_p', 'PnL Ranks (Mann-Whitney)'),
+                                        ('Permutation_adj_p', 'Mean PnL (Permutation)')]):
+        fig.add_trace(go.Bar(
+            x=pairs, y=-np.log10(tests[column].clip(lower=1e-300)), name=name,
+            marker_color=PURPLE_PALETTE[i * 2 % len(PURPLE_PALETTE)],
+            customdata=tests[column], hovertemplate="%{x}<br>adjusted p = %{customdata:.4g}<extra></extra>"
+        ))
+    fig.add_hline(y=-np.log10(SIGNIFICANCE_LEVEL), line_dash='dash', line_color='#ef4444',
+                  annotation_text=f"p = {SIGNIFICANCE_LEVEL}")
+
+    fig.update_layout(
+        height=500,
+        barmode='group',
+        title_text="Adjusted Significance by Pair (-log10 p)",
+        title_x=0.5,
+        **create_plotly_theme()['layout']
+    )
+
+    return fig
+
+# Section builders yield (kind, name, part) tuples, cheapest first, so the
+# dashboard can show each part as soon as it is ready
+
+def compute_headline_values(df):
+    """Compute the cheap headline metrics shown before any section"""
+    yield 'values', 'total_trades', len(df)
+    yield 'values', 'total_pnl', df['Closed PnL'].sum()
+    yield 'values', 'win_rate', (df['Closed PnL'] > 0).mean() * 100
+    yield 'values', 'total_volume', df['Size USD'].sum()
+
+def compute_overview_section(df):
+    """Compute overview metrics and summary"""
+    yield from compute_headline_values(df)
+
+    summary_df = pd.DataFrame({
+        'Metric': ['Date Range', 'Most Active Classification', 'Preferred Side', 'Average Trade Size'],
+        'Value': [
+            f"{df.index.min().strftime('%Y-%m-%d')} to {df.index.max().strftime('%Y-%m-%d')}",
+            df['classification'].value_counts().index[0],
+            df['Side'].value_counts().index[0],
+            f"${df['Size USD'].mean():,.2f}"
+        ]
+    })
+    yield 'tables', 'summary', summary_df
+
+def compute_pnl_section(df):
+    """Compute PnL section"""
+    fig, pnl_data = plot_pnl_by_classification(df)
+    yield 'tables', 'pnl_data', pnl_data
+    yield 'figures', 'main', fig
+
+def compute_buy_sell_section(df):
+    """Compute buy/sell section"""
+    buy_trades = df[df['Side'] == 'BUY']
+    sell_trades = df[df['Side'] == 'SELL']
+
+    aggregates = build_price_aggregates(df)
+    side_prices = summarize_price_aggregates(aggregates, ['classification', 'Side'])
+    yield 'tables', 'side_prices', side_prices
+
+    prices_by_side = side_prices['Mean_Price'].unstack('Side')
+    buy_avg_prices = prices_by_side['BUY'].dropna() if 'BUY' in prices_by_side else pd.Series(dtype=float)
+    sell_avg_prices = prices_by_side['SELL'].dropna() if 'SELL' in prices_by_side else pd.Series(dtype=float)
+
+    yield 'values', 'best_buy_classification', buy_avg_prices.idxmin() if not buy_avg_prices.empty else "N/A"
+    yield 'values', 'best_sell_classification', sell_avg_prices.idxmax() if not sell_avg_prices.empty else "N/A"
+    yield 'values', 'best_buy_price', buy_avg_prices.min() if not buy_avg_prices.empty else None
+    yield 'values', 'best_sell_price', sell_avg_prices.max() if not sell_avg_prices.empty else None
+
+    yield 'tables', 'buy_summary', buy_trades.groupby('classification').agg({
+        'Execution Price': 'mean',
+        'Size USD': 'sum',
+        'Size Tokens': 'sum'
+    }).round(4)
+    yield 'tables', 'sell_summary', sell_trades.groupby('classification').agg({
+        'Execution Price': 'mean',
+        'Size USD': 'sum',
+        'Closed PnL': 'sum'
+    }).round(4)
+
+    size_distribution = summarize_price_aggregates(aggregates, ['Side'])
+    yield 'tables', 'size_distribution', summarize_price_aggregates(aggregates, ['classification', 'Side'])[SIZE_BUCKET_LABELS]
+
+    yield 'figures', 'main', plot_buy_sell_analysis(df)
+    yield 'figures', 'size_distribution', plot_size_distribution(size_distribution)
+
+def compute_order_type_section(df):
+    """Compute order type section"""
+    market_trades = df[df['Crossed'] == True]
+    limit_trades = df[df['Crossed'] == False]
+
+    yield 'values', 'market_pnl', market_trades['Closed PnL'].sum()
+    yield 'values', 'limit_pnl', limit_trades['Closed PnL'].sum()
+    yield 'values', 'market_win_rate', (market_trades['Closed PnL'] > 0).mean() * 100
+    yield 'values', 'limit_win_rate', (limit_trades['Closed PnL'] > 0).mean() * 100
+
+    order_breakdown = df.groupby(['Crossed', 'classification']).agg({
+        'Closed PnL': ['sum', 'mean', 'count'],
+        'Fee': 'mean'
+    }).round(4)
+    order_breakdown.columns = ['Total_PnL', 'Avg_PnL', 'Count', 'Avg_Fee']
+    yield 'tables', 'order_breakdown', order_breakdown
+
+    yield 'figures', 'main', plot_order_type_analysis(df)
+
+def compute_value_section(df):
+    """Compute index value section"""
+    correlation = df[['value', 'Closed PnL', 'Execution Price', 'Size USD']].corr()
+    yield 'values', 'value_pnl_corr', correlation.loc['value', 'Closed PnL']
+
+    yield 'tables', 'value_mapping', df.groupby(['value', 'classification']).size().unstack(fill_value=0)
+    yield 'tables', 'daily', build_daily_rollups(df)
+
+    fig, value_data = plot_value_analysis(df)
+    yield 'tables', 'value_data', value_data
+    yield 'figures', 'main', fig
+
+def compute_direction_section(df):
+    """Compute direction section"""
+    long_trades = df[df['Direction'].isin(['Open Long', 'Close Long', 'Buy'])]
+    short_trades = df[df['Direction'].isin(['Open Short', 'Close Short', 'Sell'])]
+
+    yield 'values', 'long_pnl', long_trades['Closed PnL'].sum()
+    yield 'values', 'short_pnl', short_trades['Closed PnL'].sum()
+    yield 'values', 'long_count', len(long_trades)
+    yield 'values', 'short_count', len(short_trades)
+
+    direction_summary = df.groupby('Direction').agg({
+        'Closed PnL': ['sum', 'mean', 'count'],
+        'Size USD': 'sum'
+    }).round(2)
+    direction_summary.columns = ['Total_PnL', 'Avg_PnL', 'Trade_Count', 'Volume']
+    direction_summary['Win_Rate'] = df.groupby('Direction')['Closed PnL'].apply(
+        lambda x: (x > 0).mean() * 100
+    ).round(2)
+    yield 'tables', 'direction_summary', direction_summary.sort_values('Total_PnL', ascending=False)
+
+    fig, comparison_data = plot_direction_analysis(df)
+    yield 'figures', 'main', fig
+
+# Shown next to the weighting choice when fills only carry their date
+TWAP_DATE_ONLY_NOTE = ("No Timestamp column: fills within a day share one time, "
+                       "so TWAP falls back to each coin's unweighted mean price.")
+
+# Percentiles shown in the Price section
+SKETCH_QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+def compute_price_section(df):
+    """Compute execution price section"""
+    aggregates = build_price_aggregates(df)
+    daily_prices = summarize_price_aggregates(aggregates, ['Day', 'classification'])
+    yield 'tables', 'daily_prices', daily_prices[list(PRICE_WEIGHTINGS.values())]
+
+    sketches = build_quantile_sketches(df)
+    fig, price_stats = plot_execution_price_analysis(df, sketches)
+    price_stats = price_stats.join(summarize_price_aggregates(aggregates, ['classification'])[['VWAP', 'TWAP']])
+    yield 'tables', 'price_stats', price_stats
+    for (column, grouping), sketch in sketches.items():
+        yield 'tables', f"percentiles|{column}|{grouping}", sketch.quantile_table(SKETCH_QUANTILES)
+    yield 'figures', 'main', fig
+    yield 'figures', 'trend', plot_price_trend(daily_prices, 'Mean_Price')
+
+def compute_strategy_section(df):
+    """Compute strategy matrix, rankings and simulation"""
+    strategy_metrics = {}
+
+    for classification in df['classification'].unique():
+        subset = df[df['classification'] == classification]
+
+        strategy_metrics[classification] = {
+            'total_pnl': subset['Closed PnL'].sum(),
+            'win_rate': (subset['Closed PnL'] > 0).mean() * 100,
+            'avg_pnl': subset['Closed PnL'].mean(),
+            'roi': (subset['Closed PnL'].sum() / subset['Size USD'].sum()) * 100,
+            'trade_count': len(subset),
+            'avg_price': subset['Execution Price'].mean(),
+            'price_volatility': subset['Execution Price'].std() / subset['Execution Price'].mean()
+        }
+
+    strategy_df = pd.DataFrame(strategy_metrics).T
+    strategy_df = strategy_df.join(compute_risk_metrics(build_daily_pnl_matrix(df, df['classification'])))
+    yield 'tables', 'strategy_df', strategy_df
+
+    rankings = {
+        'Best Total PnL': strategy_df['total_pnl'].idxmax(),
+        'Best Win Rate': strategy_df['win_rate'].idxmax(),
+        'Best ROI': strategy_df['roi'].idxmax(),
+        'Most Active': strategy_df['trade_count'].idxmax()
+    }
+    if strategy_df['sharpe'].notna().any():
+        rankings['Best Sharpe'] = strategy_df['sharpe'].idxmax()
+    rankings['Smallest Drawdown'] = strategy_df['max_drawdown'].idxmin()
+    yield 'values', 'rankings', rankings
+    # Analytic tests only; the permutation test lives in the Significance Tests section
+    yield 'tables', 'classification_tests', compute_significance_tests(df, permutations=0)
+
+    directional = df[df['Direction'].isin(list(DIRECTION_STRATEGIES))]
+    yield 'tables', 'direction_risk', compute_risk_metrics(
+        build_daily_pnl_matrix(directional, directional['Direction'].map(DIRECTION_STRATEGIES)))
+
+    buy_recommendations = df[df['Side'] == 'BUY'].groupby('classification')['Execution Price'].mean().sort_values()
+    sell_recommendations = df[df['Side'] == 'SELL'].groupby('classification')['Execution Price'].mean().sort_values(ascending=False)
+    yield 'values', 'best_buy_period', buy_recommendations.index[0] if not buy_recommendations.empty else 'N/A'
+    yield 'values', 'best_sell_period', sell_recommendations.index[0] if not sell_recommendations.empty else 'N/A'
+
+    market_pnl = df[df['Crossed'] == True]['Closed PnL'].sum()
+    limit_pnl = df[df['Crossed'] == False]['Closed PnL'].sum()
+    yield 'values', 'better_order', "Market Orders" if market_pnl > limit_pnl else "Limit Orders"
+
+    # Simple simulation based on buy low (Neutral) sell high (Greed) strategy
+    fear_buys = df[(df['classification'] == 'Neutral') & (df['Side'] == 'BUY')]
+    greed_sells = df[(df['classification'].isin(['Greed', 'Extreme Greed'])) & (df['Side'] == 'SELL')]
+    simulation = None
+    if len(fear_buys) > 0 and len(greed_sells) > 0:
+        avg_buy_price = fear_buys['Execution Price'].mean()
+        avg_sell_price = greed_sells['Execution Price'].mean()
+        simulation = {
+            'avg_buy_price': avg_buy_price,
+            'avg_sell_price': avg_sell_price,
+            'potential_profit': avg_sell_price - avg_buy_price,
+            'roi_potential': (avg_sell_price - avg_buy_price) / avg_buy_price * 100
+        }
+    yield 'values', 'simulation', simulation
+
+def collect_section(parts):
+    """Gather a builder's parts into a figures/tables/values dict"""
+    section = {'figures': {}, 'tables': {}, 'values': {}}
+    for kind, name, part in parts:
+        section[kind][name] = part
+    return section
+
+# Section name -> builder for every section a snapshot can serve
+SECTION_BUILDERS = {
+    "📈 Overview": compute_overview_section,
+    "💰 PnL Analysis": compute_pnl_section,
+    "🔄 Buy/Sell Analysis": compute_buy_sell_section,
+    "📋 Order Type Analysis": compute_order_type_section,
+    "📊 Value Analysis": compute_value_section,
+    "🎯 Direction Analysis": compute_direction_section,
+    "💲 Price Analysis": compute_price_section,
+    "🚀 Strategy Recommendations": compute_strategy_section
+}
+
+# Bump whenever a builder's output changes; snapshots and cached report
+# sections built under another version are not served
+SECTION_SCHEMA_VERSION = 9
+
+# Background section jobs; the script thread polls so a rerun can interrupt it
+SECTION_WORKERS = 4
+SECTION_POLL_SECONDS = 0.25
+
+@st.cache_resource(show_spinner=False)
+def get_section_executor():
+    """Create the process-wide pool that runs section builders"""
+    return ThreadPoolExecutor(max_workers=SECTION_WORKERS, thread_name_prefix='section')
+
+class SectionJob:
+    """Section builder running in the background, exposing parts as they complete"""
+
+    def __init__(self, key=None):
+        self.key = key
+        self.parts = {'figures': {}, 'tables': {}, 'values': {}}
+        self.error = None
+        self.done = False
+        self._ready = threading.Condition()
+        self._cancelled = threading.Event()
+        self._future = None
+
+    @classmethod
+    def start(cls, key, builder, df):
+        """Submit a builder to the section executor"""
+        job = cls(key)
+        job._future = get_section_executor().submit(job._run, builder, df)
+        return job
+
+    @classmethod
+    def completed(cls, section):
+        """Wrap an already computed section, e.g. one read from a snapshot"""
+        job = cls()
+        for kind in job.parts:
+            job.parts[kind].update(section[kind])
+        job.done = True
+        return job
+
+    def _run(self, builder, df):
+        parts = builder(df)
+        try:
+            for kind, name, part in parts:
+                if self._cancelled.is_set():
+                    break
+                with self._ready:
+                    self.parts[kind][name] = part
+                    self._ready.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            parts.close()
+            with self._ready:
+                self.done = True
+                self._ready.notify_all()
+
+    def cancel(self):
+        """Stop the builder at its next part, or before it starts if still queued"""
+        self._cancelled.set()
+        if self._future is not None:
+            self._future.cancel()
+
+    def _wait_until(self, ready):
+        """Block until ready() holds or the job ends, touching the page between polls"""
+        status = None
+        started = time.monotonic()
+        try:
+            while True:
+                with self._ready:
+                    if ready() or self.done:
+                        return
+                    self._ready.wait(SECTION_POLL_SECONDS)
+                    if ready() or self.done:
+                        return
+                # Each page update gives Streamlit a chance to stop a superseded run
+                if status is None:
+                    status = st.empty()
+                status.caption(f"⏳ Computing… {time.monotonic() - started:.1f}s")
+        finally:
+            if status is not None:
+                status.empty()
+
+    def get(self, kind, name):
+        """Return one part, waiting for the builder to produce it"""
+        self._wait_until(lambda: name in self.parts[kind])
+        if name in self.parts[kind]:
+            return self.parts[kind][name]
+        if self.error is not None:
+            raise self.error
+        raise KeyError(name)
+
+    def draw_charts(self, slots):
+        """Fill reserved chart placeholders in the order their figures complete"""
+        pending = dict(slots)
+        while pending:
+            self._wait_until(lambda: any(name in self.parts['figures'] for name in pending))
+            ready = [name for name in pending if name in self.parts['figures']]
+            if not ready:
+                if self.error is not None:
+                    raise self.error
+                raise KeyError(next(iter(pending)))
+            for name in ready:
+                pending.pop(name).plotly_chart(self.parts['figures'][name], use_container_width=True)
+
+class SectionParts(Mapping):
+    """Read-only view of one kind of section part that waits for missing entries"""
+
+    def __init__(self, job, kind):
+        self._job = job
+        self._kind = kind
+
+    def __getitem__(self, name):
+        return self._job.get(self._kind, name)
+
+    def __iter__(self):
+        return iter(list(self._job.parts[self._kind]))
+
+    def __len__(self):
+        return len(self._job.parts[self._kind])
+
+def chart_placeholder():
+    """Reserve a spot for a chart that is still being computed"""
+    slot = st.empty()
+    slot.info("⏳ Loading chart…")
+    return slot
+
+# Columns every uploaded trade file must have
+REQUIRED_COLUMNS = ['date_only', 'classification', 'Side', 'Closed PnL', 'Size USD', 'Execution Price', 'Crossed', 'Direction', 'value']
+
+def load_trades(source):
+    """Read and prepare a merged trades CSV from a path, buffer or bytes"""
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    df = pd.read_csv(source)
+
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
+
+    # Convert date_only to datetime and set as index
+    df['date_only'] = pd.to_datetime(df['date_only'])
+    df.set_index('date_only', inplace=True)
+
+    # Keep account and coin as categorical partition dimensions
+    for col in PARTITION_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    return df
+
+def fingerprint_bytes(data):
+    """Content fingerprint of raw dataset bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+def fingerprint_file(path, chunk_size=1 << 20):
+    """Content fingerprint of a dataset file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Filtered views kept per dataset so sessions with the same filters share them
+MAX_FILTER_VIEWS = 8
+
+class DatasetRegistry:
+    """Process-wide store holding one parsed copy of each dataset, keyed by fingerprint.
+
+    Sessions hold references by id; a dataset and its filtered views are
+    dropped as soon as the last session lets go of it. Frames handed out are
+    shared, so callers must treat them as read-only (pandas copy-on-write
+    turns accidental writes into private copies).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._datasets = {}
+        self._refs = {}
+        self._views = {}
+        self._flags = {}
+        self._loading = {}
+
+    def acquire(self, session_id, fingerprint, loader):
+        """Reference a dataset for a session, loading it on first use"""
+        with self._lock:
+            self._refs.setdefault(fingerprint, set()).add(session_id)
+            if fingerprint in self._datasets:
+                return self._datasets[fingerprint]
+            load_lock = self._loading.setdefault(fingerprint, threading.Lock())
+
+        # Only one session parses a given dataset; the rest wait for it
+        with load_lock:
+            with self._lock:
+                if fingerprint in self._datasets:
+                    return self._datasets[fingerprint]
+            try:
+                df = loader()
+            except Exception:
+                self.release(session_id, fingerprint)
+                raise
+            with self._lock:
+                self._loading.pop(fingerprint, None)
+                if session_id in self._refs.get(fingerprint, ()):
+                    self._datasets[fingerprint] = df
+                    self._views[fingerprint] = {}
+            return df
+
+    def release(self, session_id, fingerprint):
+        """Drop a session's reference and evict the dataset when unused"""
+        with self._lock:
+            sessions = self._refs.get(fingerprint)
+            if sessions is None:
+                return
+            sessions.discard(session_id)
+            if not sessions:
+                del self._refs[fingerprint]
+                self._datasets.pop(fingerprint, None)
+                self._views.pop(fingerprint, None)
+                self._flags.pop(fingerprint, None)
+
+    def outlier_flags(self, fingerprint):
+        """Outlier bitmap of a dataset, computed once and kept until the dataset is evicted"""
+        with self._lock:
+            if fingerprint in self._flags:
+                return self._flags[fingerprint]
+            df = self._datasets[fingerprint]
+
+        flags = compute_outlier_flags(df)
+        with self._lock:
+            if fingerprint in self._datasets:
+                flags = self._flags.setdefault(fingerprint, flags)
+        return flags
+
+    def view(self, fingerprint, classifications, sides, exclude_outliers=False):
+        """Rows matching a filter selection, shared across sessions"""
+        df = self._datasets[fingerprint]
+        key = (frozenset(classifications), frozenset(sides), exclude_outliers)
+
+        with self._lock:
+            views = self._views.setdefault(fingerprint, {})
+            if key in views:
+                return views[key]
+
+        if key == (frozenset(df['classification'].unique()), frozenset(df['Side'].unique()), False):
+            filtered_df = df
+        else:
+            mask = (df['classification'].isin(classifications)) & (df['Side'].isin(sides))
+            if exclude_outliers:
+                mask &= self.outlier_flags(fingerprint) == 0
+            filtered_df = df[mask]
+
+        with self._lock:
+            views = self._views.get(fingerprint)
+            if views is not None:
+                if len(views) >= MAX_FILTER_VIEWS:
+                    views.pop(next(iter(views)))
+                views[key] = filtered_df
+        return filtered_df
+
+    def stats(self):
+        """Datasets currently held and how many sessions reference each"""
+        with self._lock:
+            return {fingerprint: len(sessions) for fingerprint, sessions in self._refs.items()}
+
+class DatasetSession:
+    """A browser session's handle on the registry; released when the session goes away"""
+
+    def __init__(self, registry):
+        self.id = uuid.uuid4().hex
+        self.fingerprint = None
+        self._registry = registry
+        # The finalizer must not reference self, so the attached fingerprint lives in a shared list
+        self._attached = [None]
+        weakref.finalize(self, DatasetSession._release, registry, self.id, self._attached)
+
+    @staticmethod
+    def _release(registry, session_id, holder):
+        if holder[0] is not None:
+            registry.release(session_id, holder[0])
+
+    def attach(self, fingerprint, loader):
+        """Switch this session to a dataset, releasing the previous one"""
+        if self.fingerprint is not None and self.fingerprint != fingerprint:
+            self._registry.release(self.id, self.fingerprint)
+            self.fingerprint = None
+            self._attached[0] = None
+        df = self._registry.acquire(self.id, fingerprint, loader)
+        self.fingerprint = fingerprint
+        self._attached[0] = fingerprint
+        return df
+
+@st.cache_resource(show_spinner=False)
+def get_dataset_registry():
+    """The registry shared by every session in this process"""
+    return DatasetRegistry()
+
+# Canonical dataset and its precomputed snapshot
+DEFAULT_DATASET_PATH = os.environ.get('BITCOIN_DATASET_PATH', 'csv/merged_bitcoin_trades_sentiment.csv')
+DEFAULT_SNAPSHOT_PATH = os.environ.get('BITCOIN_SNAPSHOT_PATH', 'snapshots/report.snap')
+
+# Snapshot layout: magic, format version, manifest length, JSON manifest, zlib blobs
+SNAPSHOT_MAGIC = b'BTCSNAP'
+SNAPSHOT_VERSION = 2
+_SNAPSHOT_HEADER = struct.Struct('<7sBQ')
+
+def _to_json_value(obj):
+    """JSON fallback for numpy and pandas scalars"""
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, (np.floating, float)):
+        return None if np.isnan(obj) else float(obj)
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    if isinstance(obj, (pd.Timestamp, datetime)):
+        return obj.isoformat()
+    raise TypeError(f"Cannot serialize {type(obj).__name__}")
+
+def _encode_table(table):
+    """Serialize a table with its index and dtypes"""
+    table = table.copy()
+    table.columns = [str(col) for col in table.columns]
+    if isinstance(table.index, pd.MultiIndex) or table.index.name is not None:
+        table.index.names = [name if name is not None else f"level_{i}" for i, name in enumerate(table.index.names)]
+        date_levels = [name for name in table.index.names
+                       if pd.api.types.is_datetime64_any_dtype(table.index.get_level_values(name))]
+        return (table.reset_index().to_json(orient='split', date_format='iso', double_precision=15),
+                list(table.index.names), date_levels)
+    return table.to_json(orient='split', date_format='iso', double_precision=15), [], []
+
+def _decode_table(payload, index_names, date_levels):
+    """Inverse of _encode_table"""
+    table = pd.read_json(io.StringIO(payload), orient='split', convert_dates=False, keep_default_dates=False)
+    for name in date_levels:
+        table[name] = pd.to_datetime(table[name])
+    if index_names:
+        table = table.set_index(index_names)
+    return table
+
+def _finite_values(obj):
+    if isinstance(obj, dict):
+        return {key: _finite_values(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite_values(value) for value in obj]
+    if isinstance(obj, (float, np.floating)) and not np.isfinite(obj):
+        return None
+    return obj
+
+def section_to_json(section, **metadata):
+    """Serialize a section's values and tables as strict JSON for external consumers"""
+    tables = {}
+    for table_name, table in section['tables'].items():
+        payload, index_names, date_levels = _encode_table(table)
+        tables[table_name] = _finite_values(dict(json.loads(payload), index_names=index_names))
+
+    return json.dumps(dict(metadata, values=_finite_values(section['values']), tables=tables),
+                      default=_to_json_value, allow_nan=False, ensure_ascii=False)
+
+def write_report_snapshot(path, sections, manifest):
+    """Write section tables and figure specs to a versioned snapshot file"""
+    blobs = []
+    offset = 0
+    entries = {}
+
+    def add_blob(text):
+        nonlocal offset
+        blob = zlib.compress(text.encode('utf-8'), 6)
+        blobs.append(blob)
+        location = [offset, len(blob)]
+        offset += len(blob)
+        return location
+
+    for name, section in sections.items():
+        entry = {'figures': {}, 'tables': {}, 'values': section['values']}
+        for fig_name, fig in section['figures'].items():
+            entry['figures'][fig_name] = add_blob(fig.to_json())
+        for table_name, table in section['tables'].items():
+            payload, index_names, date_levels = _encode_table(table)
+            entry['tables'][table_name] = add_blob(payload) + [index_names, date_levels]
+        entries[name] = entry
+
+    manifest = dict(manifest, version=SNAPSHOT_VERSION, schema=SECTION_SCHEMA_VERSION, sections=entries)
+    header = json.dumps(manifest, default=_to_json_value).encode('utf-8')
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header)))
+        f.write(header)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, path)
+
+class ReportSnapshot:
+    """Memory-mapped snapshot whose sections are decoded on first access"""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, header_length = _SNAPSHOT_HEADER.unpack_from(self._map, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot format in {path}")
+
+        start = _SNAPSHOT_HEADER.size
+        self.manifest = json.loads(self._map[start:start + header_length])
+        if self.manifest.get('schema') != SECTION_SCHEMA_VERSION:
+            raise ValueError(f"Snapshot {path} predates the current section contents; rebuild it with build_snapshot.py")
+        self._data_start = start + header_length
+        self._sections = {}
+
+    @property
+    def fingerprint(self):
+        return self.manifest['fingerprint']
+
+    def _blob(self, location):
+        offset, length = location[:2]
+        start = self._data_start + offset
+        return zlib.decompress(self._map[start:start + length]).decode('utf-8')
+
+    def section(self, name):
+        """Decode one section's figures, tables and values"""
+        if name not in self._sections:
+            entry = self.manifest['sections'][name]
+            self._sections[name] = {
+                'figures': {fig_name: pio.from_json(self._blob(location))
+                            for fig_name, location in entry['figures'].items()},
+                'tables': {table_name: _decode_table(self._blob(location), *location[2:])
+                           for table_name, location in entry['tables'].items()},
+                'values': entry['values']
+            }
+        return self._sections[name]
+
+def build_report_snapshot(dataset_path, snapshot_path):
+    """Run every snapshot section over a dataset and persist the results"""
+    df = load_trades(dataset_path)
+    sections = {name: collect_section(builder(df)) for name, builder in SECTION_BUILDERS.items()}
+    stat = os.stat(dataset_path)
+
+    write_report_snapshot(snapshot_path, sections, {
+        'fingerprint': fingerprint_file(dataset_path),
+        'dataset': {'path': os.path.abspath(dataset_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns},
+        'built_at': datetime.now().isoformat(timespec='seconds'),
+        'columns': df.columns.tolist(),
+        'options': {
+            'classification': df['classification'].unique().tolist(),
+            'Side': df['Side'].unique().tolist()
+        }
+    })
+
+    return sections
+
+@st.cache_resource(show_spinner=False)
+def load_report_snapshot(path, mtime_ns):
+    """Open a snapshot once per process; the mtime key reloads it after a rebuild"""
+    return ReportSnapshot(path)
+
+def resolve_dataset_fingerprint(path, snapshot):
+    """Fingerprint the canonical dataset, trusting the snapshot when the file is unchanged"""
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    if snapshot is not None:
+        recorded = snapshot.manifest['dataset']
+        if recorded['size'] == stat.st_size and recorded['mtime_ns'] == stat.st_mtime_ns:
+            return snapshot.fingerprint
+    return fingerprint_file(path)
+
+# Headless HTML report; rendered sections are cached by the content they were built from
+REPORT_MAX_ROWS = 60
+
+REPORT_CSS = """
+body { font-family: 'Inter', sans-serif; background: #1a0d2e; color: #e6e6fa; margin: 2rem; }
+h1 { color: #dda0dd; }
+h2 { color: #dda0dd; border-bottom: 1px solid #6a4c93; padding-bottom: 0.3rem; margin-top: 2.5rem; }
+h3 { color: #e6e6fa; }
+table.data { border-collapse: collapse; margin: 1rem 0; font-size: 0.85rem; }
+table.data th, table.data td { border: 1px solid #6a4c93; padding: 0.3rem 0.6rem; text-align: right; }
+table.data th { background: #2d1b3d; }
+.metrics { display: flex; gap: 1rem; }
+.metric { background: linear-gradient(135deg, #2d1b3d, #3d2a4f); border-radius: 12px; padding: 1rem 1.5rem; }
+.metric h3 { margin: 0; font-size: 0.9rem; }
+.metric p { margin: 0.3rem 0 0; font-size: 1.5rem; color: #dda0dd; font-weight: 700; }
+img.chart { max-width: 100%; }
+"""
+
+def frame_fingerprint(df):
+    """Hash a frame's index and contents so unchanged subsets reuse cached sections"""
+    hashed = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    return hashlib.sha256(hashed.tobytes() + ','.join(map(str, df.columns)).encode('utf-8')).hexdigest()
+
+def _format_report_value(value):
+    if isinstance(value, (float, np.floating)):
+        return f"{value:,.4f}"
+    if isinstance(value, (int, np.integer)):
+        return f"{value:,}"
+    return html.escape(str(value))
+
+def _render_report_values(values):
+    rows = []
+    for name, value in values.items():
+        if isinstance(value, dict):
+            rows.extend(f"<tr><th>{html.escape(name)}: {html.escape(str(key))}</th><td>{_format_report_value(item)}</td></tr>"
+                        for key, item in value.items())
+        else:
+            rows.append(f"<tr><th>{html.escape(name)}</th><td>{_format_report_value(value)}</td></tr>")
+    return f"<table class=\"data\">{''.join(rows)}</table>"
+
+def _render_report_figure(fig, static_images):
+    if static_images:
+        # Static export needs the optional kaleido package
+        image = base64.b64encode(pio.to_image(fig, format='png', width=1100, height=600)).decode('ascii')
+        return f'<img class="chart" src="data:image/png;base64,{image}"/>'
+    return pio.to_html(fig, include_plotlyjs=False, full_html=False)
+
+def render_report_section(name, df, static_images=False):
+    """Compute one dashboard section and render it as an HTML fragment"""
+    section = collect_section(SECTION_BUILDERS[name](df))
+    parts = [f"<h2>{html.escape(name)}</h2>"]
+    if section['values']:
+        parts.append(_render_report_values(section['values']))
+    for table_name, table in section['tables'].items():
+        heading = ' · '.join(table_name.split('|')).replace('_', ' ')
+        parts.append(f"<h3>{html.escape(heading)}</h3>")
+        parts.append(table.to_html(classes='data', border=0, max_rows=REPORT_MAX_ROWS,
+                                   float_format=lambda v: f"{v:,.4f}"))
+    for fig in section['figures'].values():
+        parts.append(_render_report_figure(fig, static_images))
+    return '\n'.join(parts)
+
+def build_html_report(df, title, cache_dir=None, workers=4, static_images=False):
+    """Render every dashboard section into one self-contained HTML page"""
+    fingerprint = frame_fingerprint(df)
+    fragments = {}
+    pending = {}
+    for name in SECTION_BUILDERS:
+        key = hashlib.sha256(f"{SECTION_SCHEMA_VERSION}|{static_images}|{name}|{fingerprint}".encode('utf-8')).hexdigest()
+        cache_path = os.path.join(cache_dir, f"{key}.html") if cache_dir else None
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, encoding='utf-8') as f:
+                fragments[name] = f.read()
+        else:
+            pending[name] = cache_path
+
+    # Sections are independent, so the ones not in the cache render side by side
+    if pending:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            rendered = dict(zip(pending, executor.map(
+                lambda name: render_report_section(name, df, static_images), pending)))
+        for name, cache_path in pending.items():
+            fragments[name] = rendered[name]
+            if cache_path:
+                os.makedirs(cache_dir, exist_ok=True)
+                with open(cache_path, 'w', encoding='utf-8') as f:
+                    f.write(rendered[name])
+
+    headline = collect_section(compute_headline_values(df))['values']
+    metrics = ''.join(f'<div class="metric"><h3>{label}</h3><p>{value}</p></div>' for label, value in [
+        ("Total Trades", f"{headline['total_trades']:,}"),
+        ("Total PnL", f"${headline['total_pnl']:,.2f}"),
+        ("Win Rate", f"{headline['win_rate']:.1f}%"),
+        ("Total Volume", f"${headline['total_volume']:,.0f}")
+    ])
+    plotly_js = '' if static_images else f"<script>{get_plotlyjs()}</script>"
+    body = '\n'.join(fragments[name] for name in SECTION_BUILDERS)
+    page = f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8"/>
+<title>{html.escape(title)}</title>
+<style>{REPORT_CSS}</style>
+{plotly_js}
+</head>
+<body>
+<h1>{html.escape(title)}</h1>
+<p>Generated {datetime.now().isoformat(timespec='seconds')} from {len(df):,} trades</p>
+<div class="metrics">{metrics}</div>
+{body}
+</body>
+</html>
+"""
+    return page, len(pending)
 
 def main():
     # Load custom CSS
@@ -553,9 +2793,39 @@ def main():
         type=['csv'],
         help="Upload your Bitcoin trading data CSV file"
     )
+
+    # Precomputed snapshot of the canonical dataset, if one has been built
+    snapshot = None
+    if os.path.exists(DEFAULT_SNAPSHOT_PATH):
+        try:
+            snapshot = load_report_snapshot(DEFAULT_SNAPSHOT_PATH, os.stat(DEFAULT_SNAPSHOT_PATH).st_mtime_ns)
+        except Exception as e:
+            st.sidebar.warning(f"⚠️ Ignoring unreadable snapshot: {str(e)}")
+
+    # Without an upload, fall back to the canonical dataset
+    if uploaded_file is not None:
+        data_source = uploaded_file.getvalue()
+        # Hash each upload once, not on every rerun
+        upload_id = getattr(uploaded_file, 'file_id', None)
+        cached = st.session_state.get('upload_fingerprint')
+        if upload_id is not None and cached is not None and cached[0] == upload_id:
+            fingerprint = cached[1]
+        else:
+            fingerprint = fingerprint_bytes(data_source)
+            st.session_state['upload_fingerprint'] = (upload_id, fingerprint)
+    else:
+        data_source = DEFAULT_DATASET_PATH
+        fingerprint = resolve_dataset_fingerprint(DEFAULT_DATASET_PATH, snapshot)
+        if fingerprint is None and snapshot is not None:
+            # The snapshot alone can still serve the default view
+            fingerprint = snapshot.fingerprint
+            data_source = None
+
+    if snapshot is not None and snapshot.fingerprint != fingerprint:
+        snapshot = None
     
-    # Check if file is uploaded
-    if uploaded_file is None:
+    # Check if any data is available
+    if fingerprint is None:
         st.sidebar.warning("⚠️ Please upload a CSV file to proceed.")
         st.markdown("""
         <div class="warning-box">
@@ -565,46 +2835,67 @@ def main():
         """, unsafe_allow_html=True)
         return  # Stop execution until a file is uploaded
     
-    # Load and validate data
-    try:
-        df = pd.read_csv(uploaded_file)
-        # Check if required columns exist
-        required_columns = ['date_only', 'classification', 'Side', 'Closed PnL', 'Size USD', 'Execution Price', 'Crossed', 'Direction', 'value']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            st.sidebar.error(f"❌ Missing required columns: {', '.join(missing_columns)}")
+    # Load and validate data; a matching snapshot defers this until a section needs rows.
+    # Parsed data lives in the process-wide registry so sessions share one copy
+    if 'dataset_session' not in st.session_state:
+        st.session_state['dataset_session'] = DatasetSession(get_dataset_registry())
+    dataset_session = st.session_state['dataset_session']
+
+    def load_dataset():
+        return dataset_session.attach(fingerprint, lambda: load_trades(data_source))
+
+    df = None
+    if snapshot is None:
+        try:
+            df = load_dataset()
+            st.sidebar.success("✅ Data loaded successfully!")
+        except ValueError as e:
+            st.sidebar.error(f"❌ {str(e)}")
             st.markdown(f"""
             <div class="warning-box">
                 <h3>❌ Invalid Data Format</h3>
-                <p>The uploaded CSV file is missing the following required columns: {', '.join(missing_columns)}</p>
-                <p>Please ensure your CSV contains all required columns: {', '.join(required_columns)}</p>
+                <p>The uploaded CSV file is invalid: {str(e)}</p>
+                <p>Please ensure your CSV contains all required columns: {', '.join(REQUIRED_COLUMNS)}</p>
             </div>
             """, unsafe_allow_html=True)
             return  # Stop execution if required columns are missing
-        
-        # Convert date_only to datetime and set as index
-        if 'date_only' in df.columns:
-            df['date_only'] = pd.to_datetime(df['date_only'])
-            df.set_index('date_only', inplace=True)
-        st.sidebar.success("✅ Data loaded successfully!")
-    except Exception as e:
-        st.sidebar.error(f"❌ Error loading file: {str(e)}")
-        st.markdown(f"""
-        <div class="warning-box">
-            <h3>❌ Error Loading File</h3>
-            <p>An error occurred while loading the CSV file: {str(e)}</p>
-            <p>Please upload a valid CSV file with the correct format.</p>
-        </div>
-        """, unsafe_allow_html=True)
-        return  # Stop execution if file loading fails
+        except Exception as e:
+            st.sidebar.error(f"❌ Error loading file: {str(e)}")
+            st.markdown(f"""
+            <div class="warning-box">
+                <h3>❌ Error Loading File</h3>
+                <p>An error occurred while loading the CSV file: {str(e)}</p>
+                <p>Please upload a valid CSV file with the correct format.</p>
+            </div>
+            """, unsafe_allow_html=True)
+            return  # Stop execution if file loading fails
+        columns = df.columns.tolist()
+        classification_options = df['classification'].unique().tolist()
+        side_options = df['Side'].unique().tolist()
+    else:
+        st.sidebar.success(f"⚡ Serving precomputed snapshot ({snapshot.manifest['built_at']})")
+        columns = snapshot.manifest['columns']
+        classification_options = snapshot.manifest['options']['classification']
+        side_options = snapshot.manifest['options']['Side']
     
     # Analysis options
     st.sidebar.markdown("### 🎯 Analysis Options")
+    analysis_options = list(SECTION_BUILDERS)
+    partition_dims = [col for col in PARTITION_COLUMNS if col in columns]
+    if partition_dims:
+        analysis_options.append("🏦 Account & Coin Analysis")
+    if all(col in columns for col in POSITION_COLUMNS):
+        analysis_options.append("📦 Position Analysis")
+        analysis_options.append("🔁 Trade Lifecycle")
+    if all(col in columns for col in ['Timestamp', 'Fee']):
+        analysis_options.append("💸 Execution Costs")
+    analysis_options.append("🚨 Outlier Detection")
+    analysis_options.append("🧮 Pivot Explorer")
+    analysis_options.append("🧪 Significance Tests")
+
     analysis_type = st.sidebar.selectbox(
         "Select Analysis Type",
-        ["📈 Overview", "💰 PnL Analysis", "🔄 Buy/Sell Analysis", 
-         "📋 Order Type Analysis", "📊 Value Analysis", 
-         "🎯 Direction Analysis", "💲 Price Analysis", "🚀 Strategy Recommendations"]
+        analysis_options
     )
     
     # Filter options
@@ -612,31 +2903,87 @@ def main():
     
     selected_classifications = st.sidebar.multiselect(
         "Select Classifications",
-        options=df['classification'].unique(),
-        default=df['classification'].unique()
+        options=classification_options,
+        default=classification_options
     )
     
     selected_sides = st.sidebar.multiselect(
         "Select Trading Sides",
-        options=df['Side'].unique(),
-        default=df['Side'].unique()
+        options=side_options,
+        default=side_options
     )
-    
-    # Apply filters
-    filtered_df = df[
-        (df['classification'].isin(selected_classifications)) &
-        (df['Side'].isin(selected_sides))
-    ]
-    
-    # Check if filtered data is empty
-    if filtered_df.empty:
-        st.markdown("""
-        <div class="warning-box">
-            <h3>⚠️ No Data Available</h3>
-            <p>The selected filters result in no data. Please adjust the classification or side filters.</p>
-        </div>
-        """, unsafe_allow_html=True)
-        return
+
+    exclude_outliers = st.sidebar.checkbox(
+        "Exclude Outlier Fills",
+        help="Drop fills with a robust z-score above "
+             f"{OUTLIER_THRESHOLD} in price, size or PnL against their coin's fills that day"
+    )
+
+    # The snapshot holds the unfiltered view; any other selection recomputes
+    use_snapshot = (snapshot is not None and analysis_type in SECTION_BUILDERS and
+                    set(selected_classifications) == set(classification_options) and
+                    set(selected_sides) == set(side_options) and not exclude_outliers)
+
+    if not use_snapshot:
+        if df is None:
+            if data_source is None:
+                st.markdown("""
+                <div class="warning-box">
+                    <h3>⚠️ Dataset Unavailable</h3>
+                    <p>Only the precomputed snapshot is available. Reset the filters or upload the CSV file to explore further.</p>
+                </div>
+                """, unsafe_allow_html=True)
+                return
+            df = load_dataset()
+
+        # Apply filters
+        filtered_df = get_dataset_registry().view(fingerprint, selected_classifications, selected_sides, exclude_outliers)
+        if exclude_outliers:
+            flagged = int((get_dataset_registry().outlier_flags(fingerprint) > 0).sum())
+            st.sidebar.caption(f"🚨 {flagged:,} of {len(df):,} fills flagged as outliers")
+        
+        # Check if filtered data is empty
+        if filtered_df.empty:
+            st.markdown("""
+            <div class="warning-box">
+                <h3>⚠️ No Data Available</h3>
+                <p>The selected filters result in no data. Please adjust the classification or side filters.</p>
+            </div>
+            """, unsafe_allow_html=True)
+            return
+
+    # Sections compute in the background; a job left over from another
+    # section or filter selection is cancelled
+    job_key = (fingerprint, analysis_type, tuple(sorted(selected_classifications)), tuple(sorted(selected_sides)),
+               exclude_outliers)
+    job = st.session_state.get('section_job')
+    if job is not None and job.key != job_key:
+        job.cancel()
+        job = st.session_state['section_job'] = None
+
+    chart_slots = {}
+    if analysis_type in SECTION_BUILDERS:
+        if use_snapshot:
+            job = SectionJob.completed(snapshot.section(analysis_type))
+            headline = snapshot.section("📈 Overview")['values']
+        else:
+            if job is None:
+                job = SectionJob.start(job_key, SECTION_BUILDERS[analysis_type], filtered_df)
+                st.session_state['section_job'] = job
+            headline = collect_section(compute_headline_values(filtered_df))['values']
+        figures, tables, values = (SectionParts(job, kind) for kind in ('figures', 'tables', 'values'))
+
+        # Headline cards come from cheap aggregates, so they show while the section computes
+        if analysis_type != "📈 Overview":
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                create_metric_card("Trades", f"{headline['total_trades']:,}")
+            with col2:
+                create_metric_card("Total PnL", f"${headline['total_pnl']:,.2f}")
+            with col3:
+                create_metric_card("Win Rate", f"{headline['win_rate']:.1f}%")
+            with col4:
+                create_metric_card("Volume", f"${headline['total_volume']:,.0f}")
     
     # Main content based on analysis type
     if analysis_type == "📈 Overview":
@@ -646,34 +2993,20 @@ def main():
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            create_metric_card("Total Trades", f"{len(filtered_df):,}")
+            create_metric_card("Total Trades", f"{values['total_trades']:,}")
         
         with col2:
-            total_pnl = filtered_df['Closed PnL'].sum()
-            create_metric_card("Total PnL", f"${total_pnl:,.2f}")
+            create_metric_card("Total PnL", f"${values['total_pnl']:,.2f}")
         
         with col3:
-            win_rate = (filtered_df['Closed PnL'] > 0).mean() * 100
-            create_metric_card("Win Rate", f"{win_rate:.1f}%")
+            create_metric_card("Win Rate", f"{values['win_rate']:.1f}%")
         
         with col4:
-            total_volume = filtered_df['Size USD'].sum()
-            create_metric_card("Total Volume", f"${total_volume:,.0f}")
+            create_metric_card("Total Volume", f"${values['total_volume']:,.0f}")
         
         # Data summary
         st.markdown("### 📋 Data Summary")
-        summary_data = {
-            'Metric': ['Date Range', 'Most Active Classification', 'Preferred Side', 'Average Trade Size'],
-            'Value': [
-                f"{filtered_df.index.min().strftime('%Y-%m-%d')} to {filtered_df.index.max().strftime('%Y-%m-%d')}",
-                filtered_df['classification'].value_counts().index[0],
-                filtered_df['Side'].value_counts().index[0],
-                f"${filtered_df['Size USD'].mean():,.2f}"
-            ]
-        }
-        
-        summary_df = pd.DataFrame(summary_data)
-        st.dataframe(summary_df, use_container_width=True)
+        st.dataframe(tables['summary'], use_container_width=True)
         
         # Quick insights
         st.markdown("""
@@ -688,8 +3021,8 @@ def main():
     elif analysis_type == "💰 PnL Analysis":
         st.markdown("## 💰 PnL Analysis by Classification")
         
-        fig, pnl_data = plot_pnl_by_classification(filtered_df)
-        st.plotly_chart(fig, use_container_width=True)
+        pnl_data = tables['pnl_data']
+        chart_slots['main'] = chart_placeholder()
         
         # Key insights
         best_pnl = pnl_data['Total_PnL'].idxmax()
@@ -712,25 +3045,27 @@ def main():
     elif analysis_type == "🔄 Buy/Sell Analysis":
         st.markdown("## 🔄 Buy vs Sell Analysis")
         
-        fig = plot_buy_sell_analysis(filtered_df)
-        st.plotly_chart(fig, use_container_width=True)
+        chart_slots['main'] = chart_placeholder()
         
-        # Buy/Sell insights
-        buy_trades = filtered_df[filtered_df['Side'] == 'BUY']
-        sell_trades = filtered_df[filtered_df['Side'] == 'SELL']
-        
-        buy_avg_prices = buy_trades.groupby('classification')['Execution Price'].mean()
-        sell_avg_prices = sell_trades.groupby('classification')['Execution Price'].mean()
-        
-        best_buy_classification = buy_avg_prices.idxmin() if not buy_avg_prices.empty else "N/A"
-        best_sell_classification = sell_avg_prices.idxmax() if not sell_avg_prices.empty else "N/A"
+        # Buy/Sell insights, on the chosen price weighting
+        price_weighting = st.radio("Price Weighting", list(PRICE_WEIGHTINGS), horizontal=True)
+        if price_weighting == 'Time-Weighted (TWAP)' and 'Timestamp' not in columns:
+            st.caption(TWAP_DATE_ONLY_NOTE)
+        prices_by_side = tables['side_prices'][PRICE_WEIGHTINGS[price_weighting]].unstack('Side')
+        buy_prices = prices_by_side['BUY'].dropna() if 'BUY' in prices_by_side else pd.Series(dtype=float)
+        sell_prices = prices_by_side['SELL'].dropna() if 'SELL' in prices_by_side else pd.Series(dtype=float)
+        best_buy_classification = buy_prices.idxmin() if not buy_prices.empty else "N/A"
+        best_sell_classification = sell_prices.idxmax() if not sell_prices.empty else "N/A"
+        best_buy_price = buy_prices.min() if not buy_prices.empty else None
+        best_sell_price = sell_prices.max() if not sell_prices.empty else None
+        price_spread = f"${best_sell_price - best_buy_price:.4f}" if best_buy_price is not None and best_sell_price is not None else 'N/A'
         
         st.markdown(f"""
         <div class="success-box">
             <h3>🎯 Key Insights - Buy/Sell Analysis</h3>
-            <p><strong>Best time to BUY:</strong> During '{best_buy_classification}' (Avg: ${buy_avg_prices.min():.4f if not buy_avg_prices.empty else 'N/A'})</p>
-            <p><strong>Best time to SELL:</strong> During '{best_sell_classification}' (Avg: ${sell_avg_prices.max():.4f if not sell_avg_prices.empty else 'N/A'})</p>
-            <p><strong>Price Spread:</strong> ${(sell_avg_prices.max() - buy_avg_prices.min()):.4f if not (buy_avg_prices.empty or sell_avg_prices.empty) else 'N/A'}</p>
+            <p><strong>Best time to BUY:</strong> During '{best_buy_classification}' (Avg: {f"${best_buy_price:.4f}" if best_buy_price is not None else 'N/A'})</p>
+            <p><strong>Best time to SELL:</strong> During '{best_sell_classification}' (Avg: {f"${best_sell_price:.4f}" if best_sell_price is not None else 'N/A'})</p>
+            <p><strong>Price Spread:</strong> {price_spread}</p>
         </div>
         """, unsafe_allow_html=True)
         
@@ -739,133 +3074,128 @@ def main():
         
         with col1:
             st.markdown("### 🟢 Buy Trades Summary")
-            buy_summary = buy_trades.groupby('classification').agg({
-                'Execution Price': 'mean',
-                'Size USD': 'sum',
-                'Size Tokens': 'sum'
-            }).round(4)
-            st.dataframe(buy_summary, use_container_width=True)
+            st.dataframe(tables['buy_summary'], use_container_width=True)
         
         with col2:
             st.markdown("### 🔴 Sell Trades Summary")
-            sell_summary = sell_trades.groupby('classification').agg({
-                'Execution Price': 'mean',
-                'Size USD': 'sum',
-                'Closed PnL': 'sum'
-            }).round(4)
-            st.dataframe(sell_summary, use_container_width=True)
+            st.dataframe(tables['sell_summary'], use_container_width=True)
+
+        st.markdown("### ⚖️ Weighted Execution Prices")
+        st.dataframe(tables['side_prices'][list(PRICE_WEIGHTINGS.values()) + ['Std_Price', 'Trades', 'Notional']].round(4),
+                     use_container_width=True)
+
+        st.markdown("### 📦 Trade Size Distribution")
+        chart_slots['size_distribution'] = chart_placeholder()
+        st.dataframe(tables['size_distribution'], use_container_width=True)
     
     elif analysis_type == "📋 Order Type Analysis":
         st.markdown("## 📋 Order Type Analysis (Market vs Limit)")
         
-        fig = plot_order_type_analysis(filtered_df)
-        st.plotly_chart(fig, use_container_width=True)
+        chart_slots['main'] = chart_placeholder()
         
         # Order type insights
-        market_pnl = filtered_df[filtered_df['Crossed'] == True]['Closed PnL'].sum()
-        limit_pnl = filtered_df[filtered_df['Crossed'] == False]['Closed PnL'].sum()
-        
-        market_win_rate = (filtered_df[filtered_df['Crossed'] == True]['Closed PnL'] > 0).mean() * 100
-        limit_win_rate = (filtered_df[filtered_df['Crossed'] == False]['Closed PnL'] > 0).mean() * 100
+        market_pnl = values['market_pnl']
+        limit_pnl = values['limit_pnl']
         
         better_order_type = "Market Orders" if market_pnl > limit_pnl else "Limit Orders"
         
         st.markdown(f"""
         <div class="success-box">
             <h3>🎯 Key Insights - Order Type Analysis</h3>
-            <p><strong>Market Orders PnL:</strong> ${market_pnl:,.2f} (Win Rate: {market_win_rate:.2f}%)</p>
-            <p><strong>Limit Orders PnL:</strong> ${limit_pnl:,.2f} (Win Rate: {limit_win_rate:.2f}%)</p>
+            <p><strong>Market Orders PnL:</strong> ${market_pnl:,.2f} (Win Rate: {values['market_win_rate']:.2f}%)</p>
+            <p><strong>Limit Orders PnL:</strong> ${limit_pnl:,.2f} (Win Rate: {values['limit_win_rate']:.2f}%)</p>
             <p><strong>Recommended:</strong> {better_order_type}</p>
         </div>
         """, unsafe_allow_html=True)
         
         # Detailed breakdown
         st.markdown("### 📊 Order Type Breakdown by Classification")
-        order_breakdown = filtered_df.groupby(['Crossed', 'classification']).agg({
-            'Closed PnL': ['sum', 'mean', 'count'],
-            'Fee': 'mean'
-        }).round(4)
-        order_breakdown.columns = ['Total_PnL', 'Avg_PnL', 'Count', 'Avg_Fee']
-        
-        st.dataframe(order_breakdown, use_container_width=True)
+        st.dataframe(tables['order_breakdown'], use_container_width=True)
     
     elif analysis_type == "📊 Value Analysis":
         st.markdown("## 📊 Greed/Fear Index Value Analysis")
         
-        fig, value_data = plot_value_analysis(filtered_df)
-        st.plotly_chart(fig, use_container_width=True)
+        value_data = tables['value_data']
+        chart_slots['main'] = chart_placeholder()
         
         # Value insights
         best_value_pnl = value_data['Total_PnL'].idxmax()
         best_value_win_rate = value_data['Win_Rate'].idxmax()
         
-        # Correlation insights
-        correlation = filtered_df[['value', 'Closed PnL', 'Execution Price', 'Size USD']].corr()
-        value_pnl_corr = correlation.loc['value', 'Closed PnL']
-        
         st.markdown(f"""
         <div class="success-box">
             <h3>🎯 Key Insights - Index Value Analysis</h3>
             <p><strong>Most Profitable Value:</strong> {best_value_pnl} (PnL: ${value_data.loc[best_value_pnl, 'Total_PnL']:,.2f})</p>
             <p><strong>Highest Win Rate Value:</strong> {best_value_win_rate} ({value_data.loc[best_value_win_rate, 'Win_Rate']:.2f}%)</p>
-            <p><strong>Value-PnL Correlation:</strong> {value_pnl_corr:.4f}</p>
+            <p><strong>Value-PnL Correlation:</strong> {values['value_pnl_corr']:.4f}</p>
         </div>
         """, unsafe_allow_html=True)
         
         # Value mapping
         st.markdown("### 🎭 Index Value Mapping")
-        value_mapping = filtered_df.groupby(['value', 'classification']).size().unstack(fill_value=0)
-        st.dataframe(value_mapping, use_container_width=True)
+        st.dataframe(tables['value_mapping'], use_container_width=True)
         
         # Detailed value statistics
         st.markdown("### 📈 Detailed Value Statistics")
         st.dataframe(value_data.round(2), use_container_width=True)
+
+        # Lead/lag scan
+        st.markdown("### ⏱️ Lead/Lag Correlation Scan")
+        daily = tables['daily']
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            lag_signal = st.selectbox("Signal", ['value', 'value_delta'])
+        with col2:
+            lag_target = st.selectbox("Target", ['Closed PnL', 'Execution Price', 'Size USD', 'Trade_Count'])
+        with col3:
+            lag_method = st.selectbox("Method", ['pearson', 'spearman'])
+
+        max_scan = max(len(daily) - 1, 1)
+        lag_range = st.slider("Lag Range (days)", -max_scan, max_scan, (0, min(30, max_scan)))
+
+        lag_df = compute_lag_correlations(daily, lag_signal, lag_target,
+                                          lag_range[0], lag_range[1], lag_method)
+        st.plotly_chart(plot_lag_correlation(lag_df, lag_signal, lag_target), use_container_width=True)
+
+        if lag_df['Correlation'].notna().any():
+            strongest_lag = lag_df['Correlation'].abs().idxmax()
+            st.markdown(f"""
+            <div class="info-box">
+                <p><strong>Strongest Lag:</strong> {strongest_lag} days (Correlation: {lag_df.loc[strongest_lag, 'Correlation']:.4f}, {lag_df.loc[strongest_lag, 'Overlap_Days']} overlapping days)</p>
+            </div>
+            """, unsafe_allow_html=True)
+    
     
     elif analysis_type == "🎯 Direction Analysis":
         st.markdown("## 🎯 Trading Direction Analysis")
         
-        fig, comparison_data = plot_direction_analysis(filtered_df)
-        st.plotly_chart(fig, use_container_width=True)
+        chart_slots['main'] = chart_placeholder()
         
         # Direction insights
-        long_directions = ['Open Long', 'Close Long', 'Buy']
-        short_directions = ['Open Short', 'Close Short', 'Sell']
-        
-        long_trades = filtered_df[filtered_df['Direction'].isin(long_directions)]
-        short_trades = filtered_df[filtered_df['Direction'].isin(short_directions)]
-        
-        long_pnl = long_trades['Closed PnL'].sum()
-        short_pnl = short_trades['Closed PnL'].sum()
+        long_pnl = values['long_pnl']
+        short_pnl = values['short_pnl']
         
         better_strategy = "Long Strategy" if long_pnl > short_pnl else "Short Strategy"
         
         st.markdown(f"""
         <div class="success-box">
             <h3>🎯 Key Insights - Direction Analysis</h3>
-            <p><strong>Long Strategy PnL:</strong> ${long_pnl:,.2f} ({len(long_trades):,} trades)</p>
-            <p><strong>Short Strategy PnL:</strong> ${short_pnl:,.2f} ({len(short_trades):,} trades)</p>
+            <p><strong>Long Strategy PnL:</strong> ${long_pnl:,.2f} ({values['long_count']:,} trades)</p>
+            <p><strong>Short Strategy PnL:</strong> ${short_pnl:,.2f} ({values['short_count']:,} trades)</p>
             <p><strong>Recommended Strategy:</strong> {better_strategy}</p>
         </div>
         """, unsafe_allow_html=True)
         
         # Direction performance table
         st.markdown("### 📊 Direction Performance Summary")
-        direction_summary = filtered_df.groupby('Direction').agg({
-            'Closed PnL': ['sum', 'mean', 'count'],
-            'Size USD': 'sum'
-        }).round(2)
-        direction_summary.columns = ['Total_PnL', 'Avg_PnL', 'Trade_Count', 'Volume']
-        direction_summary['Win_Rate'] = filtered_df.groupby('Direction')['Closed PnL'].apply(
-            lambda x: (x > 0).mean() * 100
-        ).round(2)
-        
-        st.dataframe(direction_summary.sort_values('Total_PnL', ascending=False), use_container_width=True)
+        st.dataframe(tables['direction_summary'], use_container_width=True)
     
     elif analysis_type == "💲 Price Analysis":
         st.markdown("## 💲 Execution Price Analysis")
         
-        fig, price_stats = plot_execution_price_analysis(filtered_df)
-        st.plotly_chart(fig, use_container_width=True)
+        price_stats = tables['price_stats']
+        chart_slots['main'] = chart_placeholder()
         
         # Price insights
         highest_avg_price = price_stats['mean'].idxmax()
@@ -884,80 +3214,75 @@ def main():
         # Price statistics table
         st.markdown("### 📊 Price Statistics by Classification")
         st.dataframe(price_stats.round(4), use_container_width=True)
+
+        # Sketch-based percentiles
+        st.markdown("### 📐 Percentiles")
+        col1, col2 = st.columns(2)
+        with col1:
+            percentile_column = st.selectbox("Column", SKETCH_COLUMNS)
+        with col2:
+            percentile_grouping = st.selectbox("Group By", list(SKETCH_GROUPINGS))
+        percentile_table = tables[f"percentiles|{percentile_column}|{percentile_grouping}"]
+        st.dataframe(percentile_table.round(4), use_container_width=True)
         
         # Price trend analysis
         st.markdown("### 📈 Price Trend Over Time")
-        price_trend = filtered_df.groupby([filtered_df.index.date, 'classification'])['Execution Price'].mean().unstack()
-        
-        price_trend_fig = px.line(
-            price_trend.reset_index(), 
-            x='date_only', 
-            y=price_trend.columns.tolist(),
-            title="Average Execution Price Trend by Classification",
-            color_discrete_sequence=PURPLE_PALETTE
-        )
-        price_trend_fig.update_layout(**create_plotly_theme()['layout'])
-        st.plotly_chart(price_trend_fig, use_container_width=True)
+        trend_weighting = st.radio("Price Weighting", list(PRICE_WEIGHTINGS), horizontal=True)
+        if trend_weighting == 'Time-Weighted (TWAP)' and 'Timestamp' not in columns:
+            st.caption(TWAP_DATE_ONLY_NOTE)
+        if trend_weighting == 'Unweighted':
+            chart_slots['trend'] = chart_placeholder()
+        else:
+            st.plotly_chart(plot_price_trend(tables['daily_prices'], PRICE_WEIGHTINGS[trend_weighting]),
+                            use_container_width=True)
     
     elif analysis_type == "🚀 Strategy Recommendations":
         st.markdown("## 🚀 Trading Strategy Recommendations")
         
-        # Calculate strategy metrics
-        strategy_metrics = {}
-        
-        for classification in filtered_df['classification'].unique():
-            subset = filtered_df[filtered_df['classification'] == classification]
-            
-            strategy_metrics[classification] = {
-                'total_pnl': subset['Closed PnL'].sum(),
-                'win_rate': (subset['Closed PnL'] > 0).mean() * 100,
-                'avg_pnl': subset['Closed PnL'].mean(),
-                'roi': (subset['Closed PnL'].sum() / subset['Size USD'].sum()) * 100,
-                'trade_count': len(subset),
-                'avg_price': subset['Execution Price'].mean(),
-                'price_volatility': subset['Execution Price'].std() / subset['Execution Price'].mean()
-            }
-        
-        strategy_df = pd.DataFrame(strategy_metrics).T
-        
         # Strategy performance matrix
         st.markdown("### 📊 Strategy Performance Matrix")
-        st.dataframe(strategy_df.round(4), use_container_width=True)
+        st.dataframe(tables['strategy_df'].round(4), use_container_width=True)
+
+        # Risk by direction
+        st.markdown("### 🛡️ Risk by Direction")
+        st.dataframe(tables['direction_risk'].round(4), use_container_width=True)
+        st.markdown(f"""
+        <div class="info-box">
+            <p>Risk metrics use each group's daily PnL on the days it traded. Sharpe and Sortino are annualized over
+            {RISK_PERIODS_PER_YEAR} days; VaR and CVaR are historical daily losses at {RISK_CONFIDENCE:.0%} confidence,
+            and the tail ratio compares the best and worst {1 - RISK_CONFIDENCE:.0%} of days.</p>
+        </div>
+        """, unsafe_allow_html=True)
         
         # Rankings
         col1, col2 = st.columns(2)
         
         with col1:
             st.markdown("### 🏆 Performance Rankings")
-            rankings = {
-                'Best Total PnL': strategy_df['total_pnl'].idxmax(),
-                'Best Win Rate': strategy_df['win_rate'].idxmax(),
-                'Best ROI': strategy_df['roi'].idxmax(),
-                'Most Active': strategy_df['trade_count'].idxmax()
-            }
-            
-            for metric, classification in rankings.items():
+            for metric, classification in values['rankings'].items():
                 st.markdown(f"**{metric}:** {classification}")
         
         with col2:
             st.markdown("### 📈 Strategy Recommendations")
-            
-            # Buy strategy
-            buy_trades = filtered_df[filtered_df['Side'] == 'BUY']
-            buy_recommendations = buy_trades.groupby('classification')['Execution Price'].mean().sort_values()
-            
-            # Sell strategy
-            sell_trades = filtered_df[filtered_df['Side'] == 'SELL']
-            sell_recommendations = sell_trades.groupby('classification')['Execution Price'].mean().sort_values(ascending=False)
-            
-            st.markdown(f"**🟢 Best Buy Period:** {buy_recommendations.index[0] if not buy_recommendations.empty else 'N/A'}")
-            st.markdown(f"**🔴 Best Sell Period:** {sell_recommendations.index[0] if not sell_recommendations.empty else 'N/A'}")
-            
-            # Order type recommendation
-            market_pnl = filtered_df[filtered_df['Crossed'] == True]['Closed PnL'].sum()
-            limit_pnl = filtered_df[filtered_df['Crossed'] == False]['Closed PnL'].sum()
-            better_order = "Market Orders" if market_pnl > limit_pnl else "Limit Orders"
-            st.markdown(f"**📋 Preferred Orders:** {better_order}")
+            st.markdown(f"**🟢 Best Buy Period:** {values['best_buy_period']}")
+            st.markdown(f"**🔴 Best Sell Period:** {values['best_sell_period']}")
+            st.markdown(f"**📋 Preferred Orders:** {values['better_order']}")
+
+        # Do the leaders beat the other classifications beyond chance?
+        st.markdown("### 🧪 Are the Leaders Significant?")
+        classification_tests = tables['classification_tests']
+        strategy_df = tables['strategy_df']
+        for label, leader, column, test in [
+            ('Best Win Rate', strategy_df['win_rate'].idxmax(), 'Win_Rate_adj_p', 'two-proportion z-test'),
+            ('Best Avg PnL', strategy_df['avg_pnl'].idxmax(), 'Welch_adj_p', "Welch's t-test")
+        ]:
+            leader_tests = classification_tests[
+                (classification_tests.index.get_level_values('Group_A') == leader) |
+                (classification_tests.index.get_level_values('Group_B') == leader)
+            ]
+            significant = (leader_tests[column] < SIGNIFICANCE_LEVEL).sum()
+            st.markdown(f"**{label} ({leader}):** significantly different from {significant} of {len(leader_tests)} "
+                        f"other classifications ({test}, Holm-adjusted, p < {SIGNIFICANCE_LEVEL})")
         
         # Comprehensive strategy
         st.markdown("""
@@ -991,28 +3316,312 @@ def main():
         st.markdown("### 🧪 Strategy Simulation")
         
         if st.button("🚀 Run Strategy Simulation", help="Simulate the recommended strategy"):
-            with st.spinner("Running simulation..."):
-                # Simple simulation based on buy low (Fear) sell high (Greed) strategy
-                fear_buys = filtered_df[(filtered_df['classification'] == 'Neutral') & (filtered_df['Side'] == 'BUY')]
-                greed_sells = filtered_df[(filtered_df['classification'].isin(['Greed', 'Extreme Greed'])) & (filtered_df['Side'] == 'SELL')]
-                
-                if len(fear_buys) > 0 and len(greed_sells) > 0:
-                    avg_buy_price = fear_buys['Execution Price'].mean()
-                    avg_sell_price = greed_sells['Execution Price'].mean()
-                    
-                    potential_profit = avg_sell_price - avg_buy_price
-                    roi_potential = (potential_profit / avg_buy_price) * 100
-                    
-                    st.success(f"""
-                    📊 **Strategy Simulation Results:**
-                    - Average Buy Price (Neutral): ${avg_buy_price:.4f}
-                    - Average Sell Price (Greed): ${avg_sell_price:.4f}
-                    - Potential Profit per Token: ${potential_profit:.4f}
-                    - Potential ROI: {roi_potential:.2f}%
-                    """)
-                else:
-                    st.warning("Insufficient data for simulation with current filters.")
-    
+            simulation = values['simulation']
+            if simulation is not None:
+                st.success(f"""
+                📊 **Strategy Simulation Results:**
+                - Average Buy Price (Neutral): ${simulation['avg_buy_price']:.4f}
+                - Average Sell Price (Greed): ${simulation['avg_sell_price']:.4f}
+                - Potential Profit per Token: ${simulation['potential_profit']:.4f}
+                - Potential ROI: {simulation['roi_potential']:.2f}%
+                """)
+            else:
+                st.warning("Insufficient data for simulation with current filters.")
+
+    elif analysis_type == "🏦 Account & Coin Analysis":
+        st.markdown("## 🏦 Account & Coin Analysis")
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            partition_choices = partition_dims + ([' × '.join(partition_dims)] if len(partition_dims) > 1 else [])
+            partition_choice = st.selectbox("Partition By", partition_choices)
+        with col2:
+            leaderboard_metric = st.selectbox("Rank By", ['Total_PnL', 'Net_PnL', 'Win_Rate', 'ROI', 'Volume', 'Total_Fees', 'Trade_Count'])
+        with col3:
+            top_k = st.number_input("Top K", min_value=1, max_value=500, value=10)
+
+        dims = partition_dims if ' × ' in partition_choice else [partition_choice]
+        partition_stats = compute_partition_stats(filtered_df, dims)
+
+        # Key metrics
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            create_metric_card("Partitions", f"{len(partition_stats):,}")
+        with col2:
+            create_metric_card("Profitable", f"{(partition_stats['Total_PnL'] > 0).mean() * 100:.1f}%")
+        with col3:
+            create_metric_card("Median PnL", f"${partition_stats['Total_PnL'].median():,.2f}")
+        with col4:
+            create_metric_card("Total Fees", f"${partition_stats['Total_Fees'].sum():,.2f}")
+
+        leaderboard = top_k_partitions(partition_stats, leaderboard_metric, int(top_k))
+        laggards = top_k_partitions(partition_stats, leaderboard_metric, int(top_k), ascending=True)
+
+        st.plotly_chart(plot_partition_leaderboard(leaderboard, leaderboard_metric), use_container_width=True)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown("### 🏆 Leaders")
+            st.dataframe(leaderboard.round(2), use_container_width=True)
+        with col2:
+            st.markdown("### 📉 Laggards")
+            st.dataframe(laggards.round(2), use_container_width=True)
+
+    elif analysis_type == "📦 Position Analysis":
+        st.markdown("## 📦 FIFO Position Analysis")
+
+        # Replay always runs on the full log; filters only select which fills are reported
+        with st.spinner("Replaying fills..."):
+            fills, positions = reconstruct_fifo_positions(df)
+        in_filter = (df['classification'].isin(selected_classifications) &
+                     df['Side'].isin(selected_sides)).to_numpy()
+        if exclude_outliers:
+            in_filter = in_filter & (get_dataset_registry().outlier_flags(fingerprint) == 0)
+        filtered_fills = fills[in_filter]
+
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            create_metric_card("FIFO Realized PnL", f"${filtered_fills['FIFO_PnL'].sum():,.2f}")
+        with col2:
+            create_metric_card("Unrealized PnL", f"${positions['Unrealized_PnL'].sum():,.2f}")
+        with col3:
+            create_metric_card("Open Positions", f"{len(positions):,}")
+        with col4:
+            create_metric_card("Median Holding", f"{filtered_fills['Holding_Hours'].median():,.1f}h")
+
+        position_summary = summarize_positions_by_classification(filtered_df, filtered_fills)
+        st.plotly_chart(plot_position_analysis(position_summary), use_container_width=True)
+
+        st.markdown("""
+        <div class="info-box">
+            <p>Positions are rebuilt from <strong>Start Position</strong> and <strong>Size Tokens</strong> per account and coin,
+            with closes matched to the oldest open lots first. Realized PnL is attributed to the classification on the day of the close.</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+        st.markdown("### 📊 Position Summary by Classification")
+        st.dataframe(position_summary.round(2), use_container_width=True)
+
+        st.markdown("### 📂 Open Positions")
+        st.dataframe(positions.sort_values('Exposure_USD', ascending=False).round(4), use_container_width=True)
+
+    elif analysis_type == "🔁 Trade Lifecycle":
+        st.markdown("## 🔁 Trade Lifecycle Analysis")
+
+        with st.spinner("Pairing opens with closes..."):
+            fills, positions = reconstruct_fifo_positions(df)
+            round_trips = build_round_trips(df, fills)
+
+        # A round trip is kept when it was entered under the selected filters
+        round_trips = round_trips[round_trips['Entry_Classification'].isin(selected_classifications) &
+                                  round_trips['Side'].isin(['Long' if side == 'BUY' else 'Short' for side in selected_sides])]
+        closed_trips = round_trips[round_trips['Status'] == 'Closed']
+        transitions = summarize_sentiment_transitions(round_trips)
+
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            create_metric_card("Round Trips", f"{len(closed_trips):,}")
+        with col2:
+            create_metric_card("Still Open", f"{(round_trips['Status'] == 'Open').sum():,}")
+        with col3:
+            create_metric_card("Median Holding", f"{closed_trips['Holding_Hours'].median():,.1f}h")
+        with col4:
+            create_metric_card("Round-Trip Win Rate", f"{(closed_trips['Net_PnL'] > 0).mean() * 100:.1f}%")
+
+        st.plotly_chart(plot_lifecycle_analysis(round_trips, transitions), use_container_width=True)
+
+        if not transitions['Avg_PnL'].empty:
+            best_entry, best_exit = transitions['Avg_PnL'].stack().idxmax()
+            st.markdown(f"""
+            <div class="success-box">
+                <h3>🎯 Key Insights - Trade Lifecycle</h3>
+                <p><strong>Best Entry → Exit:</strong> Enter in {best_entry}, exit in {best_exit} (Avg Net PnL: ${transitions['Avg_PnL'].loc[best_entry, best_exit]:,.2f} over {transitions['Count'].loc[best_entry, best_exit]:,} round trips)</p>
+                <p><strong>Long Median Holding:</strong> {closed_trips.loc[closed_trips['Side'] == 'Long', 'Holding_Hours'].median():,.1f}h</p>
+                <p><strong>Short Median Holding:</strong> {closed_trips.loc[closed_trips['Side'] == 'Short', 'Holding_Hours'].median():,.1f}h</p>
+            </div>
+            """, unsafe_allow_html=True)
+
+        st.markdown("### 🔀 Entry vs Exit Sentiment")
+        transition_metric = st.selectbox("Metric", list(transitions.keys()))
+        st.dataframe(transitions[transition_metric].round(2), use_container_width=True)
+
+        st.markdown("### 📋 Round Trip Summary by Side")
+        side_summary = closed_trips.groupby('Side').agg({
+            'Net_PnL': ['sum', 'mean', 'count'],
+            'Holding_Hours': ['mean', 'median']
+        }).round(2)
+        side_summary.columns = ['Total_PnL', 'Avg_PnL', 'Round_Trips', 'Avg_Holding_Hours', 'Median_Holding_Hours']
+        st.dataframe(side_summary, use_container_width=True)
+
+    elif analysis_type == "💸 Execution Costs":
+        st.markdown("## 💸 Execution Cost Analysis")
+
+        # References come from every fill in the minute; filters only select which fills are reported
+        with st.spinner("Pricing fills against same-minute VWAP..."):
+            costs = compute_execution_costs(df)
+        in_filter = (df['classification'].isin(selected_classifications) &
+                     df['Side'].isin(selected_sides)).to_numpy()
+        if exclude_outliers:
+            in_filter = in_filter & (get_dataset_registry().outlier_flags(fingerprint) == 0)
+        costs = costs[in_filter]
+
+        overall = summarize_execution_costs(costs.assign(All='All'), ['All']).iloc[0]
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            create_metric_card("Effective Cost", f"{overall['Effective_bps']:.2f} bps")
+        with col2:
+            create_metric_card("Fees", f"{overall['Fee_bps']:.2f} bps")
+        with col3:
+            create_metric_card("Slippage", f"{overall['Slippage_bps']:.2f} bps")
+        with col4:
+            create_metric_card("VWAP Coverage", f"{overall['Coverage']:.1f}%")
+
+        cost_summaries = {dim: summarize_execution_costs(costs, [dim]) for dim in COST_DIMENSIONS}
+        st.plotly_chart(plot_execution_costs(cost_summaries), use_container_width=True)
+
+        by_order_type = cost_summaries['Order Type']['Effective_bps'].dropna()
+        by_size = cost_summaries['Size Bucket']['Effective_bps'].dropna()
+        if not by_order_type.empty and not by_size.empty:
+            st.markdown(f"""
+            <div class="success-box">
+                <h3>🎯 Key Insights - Execution Costs</h3>
+                <p><strong>Cheapest Order Type:</strong> {by_order_type.idxmin()} ({by_order_type.min():.2f} bps)</p>
+                <p><strong>Cheapest Size Bucket:</strong> {by_size.idxmin()} ({by_size.min():.2f} bps)</p>
+                <p><strong>Most Expensive Size Bucket:</strong> {by_size.idxmax()} ({by_size.max():.2f} bps)</p>
+            </div>
+            """, unsafe_allow_html=True)
+
+        st.markdown("""
+        <div class="info-box">
+            <p>Effective cost is the fee plus slippage in basis points of notional. Slippage is measured against the VWAP of the
+            other fills in the same coin and minute, signed so that a positive number is a cost; fills alone in their minute
+            have no reference and are left out of the slippage average.</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+        st.markdown("### 📋 Cost Breakdown")
+        cost_dims = st.multiselect("Group By", COST_DIMENSIONS, default=['Order Type', 'Side'])
+        if cost_dims:
+            st.dataframe(summarize_execution_costs(costs, cost_dims).round(4), use_container_width=True)
+
+    elif analysis_type == "🚨 Outlier Detection":
+        st.markdown("## 🚨 Outlier Detection")
+
+        # Flags are scored on the full log; filters only select which fills are reported
+        with st.spinner("Scoring fills..."):
+            flags = get_dataset_registry().outlier_flags(fingerprint)
+        in_filter = (df['classification'].isin(selected_classifications) &
+                     df['Side'].isin(selected_sides)).to_numpy()
+        reported = df[in_filter]
+        reported_flags = flags[in_filter]
+
+        col1, col2, col3, col4 = st.columns(4)
+        for col, (column, bit) in zip([col1, col2, col3], OUTLIER_BITS.items()):
+            with col:
+                create_metric_card(f"{column} Outliers", f"{((reported_flags & bit) > 0).sum():,}")
+        with col4:
+            create_metric_card("Flagged Fills", f"{(reported_flags > 0).mean() * 100:.2f}%")
+
+        st.markdown(f"""
+        <div class="info-box">
+            <p>Each fill is scored against the other fills of its coin on the same day with a modified z-score
+            (median and MAD); coin-days with fewer than {OUTLIER_MIN_FILLS} fills use the coin's full history.
+            Fills above {OUTLIER_THRESHOLD} are flagged. Size USD is scored on a log scale and Closed PnL only on fills that realized PnL.
+            Tick <strong>Exclude Outlier Fills</strong> in the sidebar to drop flagged fills from every section.</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+        st.markdown("### 📊 Flagged Fills by Classification")
+        st.dataframe(summarize_outliers(reported, reported_flags).round(2), use_container_width=True)
+
+        st.markdown("### 🔍 Flagged Fills")
+        outlier_column = st.selectbox("Flagged On", list(OUTLIER_BITS))
+        flagged_fills = reported[(reported_flags & OUTLIER_BITS[outlier_column]) > 0]
+        st.dataframe(flagged_fills.sort_values(outlier_column, key=np.abs, ascending=False).head(200),
+                     use_container_width=True)
+
+    elif analysis_type == "🧮 Pivot Explorer":
+        st.markdown("## 🧮 Pivot Explorer")
+
+        pivot_options = pivot_dimension_names(filtered_df.columns)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            pivot_rows = st.selectbox("Rows", pivot_options, index=pivot_options.index('Direction'))
+        with col2:
+            column_options = [dim for dim in pivot_options if dim != pivot_rows]
+            pivot_columns = st.selectbox("Columns", column_options, index=column_options.index('classification')
+                                         if 'classification' in column_options else 0)
+        with col3:
+            pivot_measure = st.selectbox("Measure", list(PIVOT_MEASURES), index=list(PIVOT_MEASURES).index('Win Rate (%)'))
+
+        # High-cardinality axes get a cube of their own; the base tensor is shared
+        detail_dims = tuple(dim for dim in (pivot_rows, pivot_columns) if dim in PIVOT_DETAIL_DIMS)
+        with st.spinner("Aggregating trades..."):
+            tensor = build_pivot_tensor(filtered_df, detail_dims)
+
+        pivot_matrix = tensor.pivot(pivot_rows, pivot_columns, pivot_measure)
+        st.plotly_chart(plot_pivot_heatmap(pivot_matrix, pivot_measure), use_container_width=True)
+
+        st.markdown(f"""
+        <div class="info-box">
+            <p>This breakdown is summed from a pre-aggregated table of {len(tensor.sums['Trades']):,} observed
+            dimension combinations. Changing measures, or axes among the base dimensions, never rescans the trades;
+            {', '.join(PIVOT_DETAIL_DIMS)} each get a separate table, built the first time they are picked.</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+        st.markdown("### 📋 Pivot Table")
+        st.dataframe(pivot_matrix.round(4), use_container_width=True)
+
+    elif analysis_type == "🧪 Significance Tests":
+        st.markdown("## 🧪 Significance Tests")
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            test_grouping = st.selectbox("Compare", list(SIGNIFICANCE_GROUPINGS))
+        with col2:
+            test_correction = st.selectbox("Correction", P_VALUE_CORRECTIONS)
+        with col3:
+            test_permutations = st.select_slider("Permutations", options=[1000, 2000, 5000, 10000], value=PERMUTATIONS)
+
+        with st.spinner("Running tests..."):
+            tests = compute_significance_tests(filtered_df, test_grouping, test_correction, test_permutations)
+
+        if tests.empty:
+            st.markdown("""
+            <div class="warning-box">
+                <h3>⚠️ Not Enough Groups</h3>
+                <p>At least two groups with two or more trades are needed. Please widen the filters.</p>
+            </div>
+            """, unsafe_allow_html=True)
+        else:
+            significant_pairs = (tests[['Win_Rate_adj_p', 'Permutation_adj_p']] < SIGNIFICANCE_LEVEL).any(axis=1)
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                create_metric_card("Pairs Tested", f"{len(tests):,}")
+            with col2:
+                create_metric_card("Win Rate Differences", f"{(tests['Win_Rate_adj_p'] < SIGNIFICANCE_LEVEL).sum():,}")
+            with col3:
+                create_metric_card("Mean PnL Differences", f"{(tests['Permutation_adj_p'] < SIGNIFICANCE_LEVEL).sum():,}")
+
+            st.plotly_chart(plot_significance_tests(tests), use_container_width=True)
+
+            st.markdown(f"""
+            <div class="info-box">
+                <p>Win rates are compared with a two-proportion z-test, and PnL with Welch's t-test, the Mann-Whitney U test
+                and a {test_permutations:,}-draw permutation test on the difference in means. Each test's p-values are
+                corrected across all pairs with {test_correction}. {significant_pairs.sum()} of {len(tests)} pairs differ at
+                p &lt; {SIGNIFICANCE_LEVEL} on win rate or mean PnL.</p>
+            </div>
+            """, unsafe_allow_html=True)
+
+            st.markdown("### 📋 Pairwise Results")
+            st.dataframe(tests.round(4), use_container_width=True)
+
+    # Charts are drawn last, once the text and tables above are on the page
+    if chart_slots:
+        job.draw_charts(chart_slots)
+
     # Footer
     st.markdown("---")
     st.markdown("""
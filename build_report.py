@@ -0,0 +1,63 @@
+"""Render the dashboard sections into a self-contained HTML report.
+
+Sections whose data has not changed since the last run are served from the
+cache directory, so nightly reports for many accounts only recompute what moved:
+
+    python build_report.py [dataset.csv] [-o reports] [--by-account] [--images]
+"""
+import argparse
+import os
+import re
+import time
+
+from bitcoin_app import DEFAULT_DATASET_PATH, SECTION_BUILDERS, build_html_report, load_trades
+
+def write_report(df, title, path, args):
+    page, rendered = build_html_report(df, title, cache_dir=args.cache_dir,
+                                       workers=args.workers, static_images=args.images)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(page)
+    return rendered
+
+def main():
+    parser = argparse.ArgumentParser(description="Build HTML reports of the dashboard sections")
+    parser.add_argument('dataset', nargs='?', default=DEFAULT_DATASET_PATH,
+                        help="Merged trades CSV (default: %(default)s)")
+    parser.add_argument('-o', '--output', default='reports',
+                        help="Directory the reports are written to (default: %(default)s)")
+    parser.add_argument('--cache-dir', default=os.path.join('reports', '.cache'),
+                        help="Where rendered sections are cached between runs (default: %(default)s)")
+    parser.add_argument('--by-account', action='store_true',
+                        help="Write one report per account as well as the combined one")
+    parser.add_argument('--images', action='store_true',
+                        help="Embed static PNG charts instead of interactive ones (needs kaleido)")
+    parser.add_argument('--workers', type=int, default=4,
+                        help="Sections rendered in parallel (default: %(default)s)")
+    args = parser.parse_args()
+
+    if args.images:
+        try:
+            import kaleido  # noqa: F401
+        except ImportError:
+            parser.error("--images needs the kaleido package: pip install kaleido")
+
+    start = time.time()
+    df = load_trades(args.dataset)
+    os.makedirs(args.output, exist_ok=True)
+
+    reports = [("Bitcoin Trading Report", os.path.join(args.output, 'report.html'), df)]
+    if args.by_account:
+        if 'Account' not in df.columns:
+            parser.error("--by-account needs an 'Account' column in the dataset")
+        for account, trades in df.groupby('Account', sort=True):
+            filename = re.sub(r'[^A-Za-z0-9_.-]', '_', str(account))
+            reports.append((f"Bitcoin Trading Report - {account}",
+                            os.path.join(args.output, f"account_{filename}.html"), trades))
+
+    rendered = sum(write_report(trades, title, path, args) for title, path, trades in reports)
+    total = len(reports) * len(SECTION_BUILDERS)
+    print(f"{len(reports)} report(s) written to {args.output} in {time.time() - start:.1f}s "
+          f"({rendered} sections rendered, {total - rendered} from cache)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""Precompute every dashboard section for the canonical dataset.
+
+Run this after the merged trades CSV changes so new dashboard sessions open
+instantly:
+
+    python build_snapshot.py [dataset.csv] [snapshot.snap]
+"""
+import argparse
+import time
+
+from bitcoin_app import DEFAULT_DATASET_PATH, DEFAULT_SNAPSHOT_PATH, build_report_snapshot
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the dashboard report snapshot")
+    parser.add_argument('dataset', nargs='?', default=DEFAULT_DATASET_PATH,
+                        help="Merged trades CSV (default: %(default)s)")
+    parser.add_argument('snapshot', nargs='?', default=DEFAULT_SNAPSHOT_PATH,
+                        help="Snapshot file to write (default: %(default)s)")
+    args = parser.parse_args()
+
+    start = time.time()
+    sections = build_report_snapshot(args.dataset, args.snapshot)
+    print(f"Snapshot of {len(sections)} sections written to {args.snapshot} in {time.time() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""Serve the dashboard's aggregate tables as JSON over local HTTP, without Streamlit.
+
+    python query_service.py [dataset.csv] [--host 127.0.0.1] [--port 8765] [--workers 4]
+
+Endpoints:
+
+    GET /health
+    GET /sections
+    GET /sections/<name>?classification=Fear&classification=Greed&side=BUY&exclude_outliers=1
+
+Responses carry an ETag derived from the dataset fingerprint and the query;
+clients revalidating with If-None-Match get 304 Not Modified without any
+recomputation. Requests are accepted on an asyncio server and computed on a
+thread pool, with identical concurrent requests sharing one computation.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from bitcoin_app import (DEFAULT_DATASET_PATH, DEFAULT_SNAPSHOT_PATH, SECTION_BUILDERS, SECTION_SCHEMA_VERSION,
+                         DatasetRegistry, ReportSnapshot, collect_section, fingerprint_file, load_trades,
+                         section_to_json)
+
+# Bump when the response layout changes so clients drop cached copies; section
+# content changes are covered by SECTION_SCHEMA_VERSION, which also keys the ETag
+RESPONSE_VERSION = 1
+FILTER_PARAMS = {'classification', 'side', 'exclude_outliers'}
+# Request bodies are ignored, but must be read off the connection; larger ones are refused
+MAX_REQUEST_BODY = 64 * 1024
+
+# URL names for the dashboard sections, e.g. "💰 PnL Analysis" -> "pnl-analysis"
+SECTION_SLUGS = {re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-'): name for name in SECTION_BUILDERS}
+
+class QueryError(Exception):
+    """A request the service refuses, carrying its HTTP status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class QueryService:
+    """Computes section responses for one dataset and caches them by ETag"""
+
+    def __init__(self, dataset_path, snapshot_path, workers=4, cache_size=128):
+        self.dataset_path = dataset_path
+        self.snapshot_path = snapshot_path
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='query')
+        self.registry = DatasetRegistry()
+        self.session_id = uuid.uuid4().hex
+        self.cache_size = cache_size
+        self._responses = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._fingerprint = (None, None)
+        self._snapshot = (None, None)
+
+    def fingerprint(self):
+        """Dataset fingerprint, rehashed only when the file's size or mtime changes"""
+        stat = os.stat(self.dataset_path)
+        key = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            if self._fingerprint[0] == key:
+                return self._fingerprint[1]
+        fingerprint = fingerprint_file(self.dataset_path)
+        with self._lock:
+            previous = self._fingerprint[1]
+            self._fingerprint = (key, fingerprint)
+        if previous is not None and previous != fingerprint:
+            self.registry.release(self.session_id, previous)
+        return fingerprint
+
+    def snapshot(self, fingerprint):
+        """The precomputed snapshot, when it was built from this exact dataset"""
+        if not os.path.exists(self.snapshot_path):
+            return None
+        mtime = os.stat(self.snapshot_path).st_mtime_ns
+        with self._lock:
+            if self._snapshot[0] != mtime:
+                try:
+                    self._snapshot = (mtime, ReportSnapshot(self.snapshot_path))
+                except (OSError, ValueError):
+                    self._snapshot = (mtime, None)
+            snapshot = self._snapshot[1]
+        return snapshot if snapshot is not None and snapshot.fingerprint == fingerprint else None
+
+    def compute(self, slug, filters, fingerprint):
+        """Build one section's JSON response body"""
+        name = SECTION_SLUGS[slug]
+        snapshot = self.snapshot(fingerprint)
+        if snapshot is not None and not any(filters.values()):
+            section = snapshot.section(name)
+        else:
+            df = self.registry.acquire(self.session_id, fingerprint, lambda: load_trades(self.dataset_path))
+            classifications = filters['classification'] or df['classification'].unique().tolist()
+            sides = filters['side'] or df['Side'].unique().tolist()
+            filtered_df = self.registry.view(fingerprint, classifications, sides, filters['exclude_outliers'])
+            if filtered_df.empty:
+                raise QueryError(HTTPStatus.NOT_FOUND, "No trades match the selected filters")
+            section = collect_section(SECTION_BUILDERS[name](filtered_df))
+
+        return section_to_json(section, name=name, fingerprint=fingerprint, filters=filters).encode('utf-8')
+
+    async def respond(self, method, target, headers):
+        """Route a request to (status, body, extra headers)"""
+        if method not in ('GET', 'HEAD'):
+            raise QueryError(HTTPStatus.METHOD_NOT_ALLOWED, f"Method {method} not allowed")
+
+        url = urlsplit(target)
+        loop = asyncio.get_running_loop()
+        fingerprint = await loop.run_in_executor(self.executor, self.fingerprint)
+
+        if url.path == '/health':
+            return HTTPStatus.OK, json.dumps({'status': 'ok', 'fingerprint': fingerprint}).encode('utf-8'), {}
+        if url.path == '/sections':
+            return HTTPStatus.OK, json.dumps({'sections': SECTION_SLUGS}, ensure_ascii=False).encode('utf-8'), {}
+
+        match = re.fullmatch(r'/sections/([a-z0-9-]+)', url.path)
+        if match is None or match.group(1) not in SECTION_SLUGS:
+            raise QueryError(HTTPStatus.NOT_FOUND, f"Unknown path {url.path}")
+        slug = match.group(1)
+
+        query = parse_qs(url.query)
+        unknown = set(query) - FILTER_PARAMS
+        if unknown:
+            raise QueryError(HTTPStatus.BAD_REQUEST, f"Unknown parameters: {', '.join(sorted(unknown))}")
+        filters = {
+            'classification': sorted(set(query.get('classification', []))),
+            'side': sorted(set(query.get('side', []))),
+            'exclude_outliers': query.get('exclude_outliers', ['0'])[-1].lower() in ('1', 'true', 'yes')
+        }
+
+        key = json.dumps([RESPONSE_VERSION, SECTION_SCHEMA_VERSION, fingerprint, slug, filters])
+        etag = f'"{hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]}"'
+        cache_headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if etag in [tag.strip() for tag in headers.get('if-none-match', '').split(',')]:
+            return HTTPStatus.NOT_MODIFIED, b'', cache_headers
+
+        body = self._responses.get(key)
+        if body is not None:
+            self._responses.move_to_end(key)
+            return HTTPStatus.OK, body, cache_headers
+
+        # Identical requests in flight wait on the same computation
+        task = self._inflight.get(key)
+        if task is None:
+            task = loop.run_in_executor(self.executor, self.compute, slug, filters, fingerprint)
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        body = await asyncio.shield(task)
+
+        self._responses[key] = body
+        while len(self._responses) > self.cache_size:
+            self._responses.popitem(last=False)
+        return HTTPStatus.OK, body, cache_headers
+
+    async def handle(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                parts = request_line.decode('latin-1').split()
+                version = parts[2] if len(parts) == 3 else 'HTTP/1.0'
+                # A body that cannot be skipped leaves the stream unframed, so the connection closes after replying
+                framed = True
+                try:
+                    if 'transfer-encoding' in headers:
+                        framed = False
+                        raise QueryError(HTTPStatus.NOT_IMPLEMENTED, "Chunked request bodies are not supported")
+                    try:
+                        content_length = int(headers.get('content-length') or 0)
+                    except ValueError:
+                        content_length = -1
+                    if not 0 <= content_length <= MAX_REQUEST_BODY:
+                        framed = False
+                        raise QueryError(HTTPStatus.BAD_REQUEST if content_length < 0 else HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                         "Invalid or oversized request body")
+                    if content_length:
+                        await reader.readexactly(content_length)
+                    if len(parts) != 3:
+                        raise QueryError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+                    status, body, extra = await self.respond(parts[0], parts[1], headers)
+                except QueryError as e:
+                    status, body, extra = e.status, json.dumps({'error': str(e)}).encode('utf-8'), {}
+                except asyncio.IncompleteReadError:
+                    raise
+                except Exception as e:
+                    status, body, extra = HTTPStatus.INTERNAL_SERVER_ERROR, json.dumps({'error': str(e)}).encode('utf-8'), {}
+
+                keep_alive = framed and version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                response_headers = {
+                    'Content-Type': 'application/json; charset=utf-8',
+                    'Content-Length': str(len(body)),
+                    'Connection': 'keep-alive' if keep_alive else 'close',
+                    **extra
+                }
+                head = f"HTTP/1.1 {status.value} {status.phrase}\r\n" + \
+                    ''.join(f"{name}: {value}\r\n" for name, value in response_headers.items()) + "\r\n"
+                writer.write(head.encode('latin-1'))
+                if parts and parts[0] != 'HEAD' and status != HTTPStatus.NOT_MODIFIED:
+                    writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+async def serve(service, host, port):
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f"Serving {service.dataset_path} on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve dashboard aggregates as JSON over HTTP")
+    parser.add_argument('dataset', nargs='?', default=DEFAULT_DATASET_PATH,
+                        help="Merged trades CSV (default: %(default)s)")
+    parser.add_argument('--snapshot', default=DEFAULT_SNAPSHOT_PATH,
+                        help="Snapshot used for unfiltered requests when it matches (default: %(default)s)")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to bind (default: %(default)s)")
+    parser.add_argument('--port', type=int, default=8765, help="Port to listen on (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=4,
+                        help="Threads computing sections (default: %(default)s)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.dataset):
+        parser.error(f"Dataset not found: {args.dataset}")
+
+    try:
+        asyncio.run(serve(QueryService(args.dataset, args.snapshot, args.workers), args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
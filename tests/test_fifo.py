@@ -0,0 +1,109 @@
+from collections import defaultdict, deque
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bitcoin_app import load_trades, reconstruct_fifo_positions
+
+
+def make_trade_log(with_timestamp, seed=0):
+    """Random fills for a few account/coin partitions, as the merged CSV would hold them"""
+    rng = np.random.default_rng(seed)
+    n = 400
+    day = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 60, n), unit='D')
+    timestamp = day.as_unit('ms').asi8 + rng.integers(0, 86_400_000, n)
+    df = pd.DataFrame({
+        'date_only': day.strftime('%Y-%m-%d'),
+        'Timestamp': timestamp,
+        'Account': rng.choice(['0xaaa', '0xbbb'], n),
+        'Coin': rng.choice(['BTC', 'ETH', 'SOL'], n),
+        'classification': rng.choice(['Fear', 'Greed'], n),
+        'Side': rng.choice(['BUY', 'SELL'], n),
+        'Size Tokens': rng.integers(1, 6, n).astype(float),
+        'Execution Price': rng.uniform(50, 150, n).round(2),
+        'Crossed': rng.choice([True, False], n),
+        'Direction': 'Buy',
+        'value': 50,
+        'Closed PnL': 0.0
+    })
+    df['Size USD'] = df['Size Tokens'] * df['Execution Price']
+    # Some partitions start with inventory carried in from before the log
+    df['Start Position'] = np.where(df['Account'] == '0xaaa', 3.0, 0.0)
+    df = df.sort_values('Timestamp', kind='stable').reset_index(drop=True)
+    if not with_timestamp:
+        df = df.drop(columns='Timestamp')
+    return load_trades(df.to_csv(index=False).encode())
+
+
+def reference_fifo(df):
+    """Replay fills one at a time against a FIFO queue of open lots"""
+    if 'Timestamp' in df.columns:
+        times = df['Timestamp'].to_numpy(dtype=float) / 3.6e6
+    else:
+        times = np.array([(t - pd.Timestamp(0)).total_seconds() / 3600 for t in df.index])
+
+    rows = defaultdict(list)
+    for i, key in enumerate(zip(df['Account'], df['Coin'])):
+        rows[key].append(i)
+
+    realized = np.zeros(len(df))
+    holding = np.full(len(df), np.nan)
+    unrealized = {}
+    for key, idx in rows.items():
+        idx = sorted(idx, key=lambda i: times[i])
+        first = idx[0]
+        position = df['Start Position'].iloc[first]
+        lots = deque()
+        if position:
+            lots.append([abs(position), df['Execution Price'].iloc[first], times[first]])
+        for i in idx:
+            price = df['Execution Price'].iloc[i]
+            qty = df['Size Tokens'].iloc[i]
+            delta = qty if df['Side'].iloc[i] == 'BUY' else -qty
+            if position and np.sign(delta) == -np.sign(position):
+                closing = min(qty, abs(position))
+                remaining, pnl, age = closing, 0.0, 0.0
+                while remaining > 0:
+                    lot = lots[0]
+                    take = min(lot[0], remaining)
+                    pnl += np.sign(position) * take * (price - lot[1])
+                    age += take * (times[i] - lot[2])
+                    lot[0] -= take
+                    remaining -= take
+                    if lot[0] == 0:
+                        lots.popleft()
+                realized[i] = pnl
+                holding[i] = age / closing
+                qty -= closing
+            if qty > 0:
+                lots.append([qty, price, times[i]])
+            position += delta
+        mark = df['Execution Price'].iloc[idx[-1]]
+        if lots:
+            unrealized[key] = sum(np.sign(position) * q * (mark - p) for q, p, _ in lots)
+
+    return realized, holding, unrealized
+
+
+@pytest.mark.parametrize('with_timestamp', [True, False])
+def test_fifo_matches_loop_reference(with_timestamp):
+    df = make_trade_log(with_timestamp)
+    fills, positions = reconstruct_fifo_positions(df)
+    realized, holding, unrealized = reference_fifo(df)
+
+    np.testing.assert_allclose(fills['FIFO_PnL'].to_numpy(), realized, atol=1e-6)
+    np.testing.assert_allclose(fills['Holding_Hours'].to_numpy(), holding, atol=1e-6)
+    assert set(positions.index) == set(unrealized)
+    for key, value in unrealized.items():
+        assert positions.loc[key, 'Unrealized_PnL'] == pytest.approx(value, abs=1e-6)
+
+
+def test_holding_hours_without_timestamp_are_in_hours():
+    df = make_trade_log(with_timestamp=False)
+    fills, _ = reconstruct_fifo_positions(df)
+
+    # Fills span 60 days, so holding periods must run to days, not fractions of an hour
+    hours = fills['Holding_Hours'].dropna().to_numpy()
+    assert hours.min() >= 0
+    assert 24 < hours.max() <= 60 * 24
@@ -0,0 +1,20 @@
+import numpy as np
+import pandas as pd
+
+from bitcoin_app import build_partition_index, top_k_partitions
+
+
+def test_top_k_ranks_missing_values_last():
+    stats = pd.DataFrame({'ROI': [1.0, np.nan, 5.0, 3.0]}, index=['a', 'b', 'c', 'd'])
+
+    assert list(top_k_partitions(stats, 'ROI', 2).index) == ['c', 'd']
+    assert list(top_k_partitions(stats, 'ROI', 2, ascending=True).index) == ['a', 'd']
+    assert list(top_k_partitions(stats, 'ROI', 4).index) == ['c', 'd', 'a', 'b']
+
+
+def test_missing_labels_get_their_own_partition():
+    df = pd.DataFrame({'Account': ['x', 'y', None, 'y'], 'Coin': ['p', 'p', 'p', 'q']})
+    partition_ids, index = build_partition_index(df, ['Account', 'Coin'])
+
+    assert len(index) == 4
+    assert index[partition_ids[2]] == ('Missing', 'p')
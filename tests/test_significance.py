@@ -0,0 +1,53 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from bitcoin_app import _student_two_sided, adjust_p_values, permutation_test
+
+
+def enumerated_p_value(a, b):
+    """Exact two-sided permutation p-value over every relabelling"""
+    pooled = np.concatenate([a, b])
+    observed = abs(a.mean() - b.mean())
+    extreme = [abs(pooled[list(subset)].mean() - np.delete(pooled, list(subset)).mean()) >= observed - 1e-12
+               for subset in itertools.combinations(range(len(pooled)), len(a))]
+    return np.mean(extreme)
+
+
+@pytest.mark.parametrize('n_a, n_b', [(3, 5), (5, 3), (2, 110)])
+def test_permutation_test_matches_full_enumeration(n_a, n_b):
+    rng = np.random.default_rng(n_a * 100 + n_b)
+    a, b = rng.standard_t(2, n_a), rng.standard_t(2, n_b) + 0.5
+
+    # (2, 110) is small enough relative to the pool to take the index-drawing path
+    _, p_value = permutation_test(a, b, permutations=20000)
+    assert p_value == pytest.approx(enumerated_p_value(a, b), abs=0.015)
+
+
+def test_permutation_test_with_a_single_outlier():
+    # Only the outlier's side matters, and the observed labelling is the less extreme one
+    a, b = np.zeros(1100), np.zeros(1101)
+    b[0] = 1e6
+    assert permutation_test(a, b)[1] == 1.0
+
+
+def test_adjust_p_values():
+    p_values = [0.01, 0.04, 0.03, 0.005, np.nan]
+
+    np.testing.assert_allclose(adjust_p_values(p_values, 'Holm'), [0.03, 0.06, 0.06, 0.02, np.nan])
+    np.testing.assert_allclose(adjust_p_values(p_values, 'Benjamini-Hochberg'), [0.02, 0.04, 0.04, 0.02, np.nan])
+    with pytest.raises(ValueError):
+        adjust_p_values(p_values, 'Bonferroni')
+
+
+@pytest.mark.parametrize('t, dof, expected', [
+    (1.0, 1, 0.5),
+    (4.302653, 2, 0.05),
+    (2.228139, 10, 0.05),
+    (-2.228139, 10, 0.05),
+    (0.0, 5, 1.0),
+    (1.959964, 1e7, 0.05)
+])
+def test_student_two_sided(t, dof, expected):
+    assert _student_two_sided(t, dof) == pytest.approx(expected, abs=1e-6)
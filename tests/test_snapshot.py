@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+
+import bitcoin_app
+from bitcoin_app import ReportSnapshot, write_report_snapshot
+
+
+def make_sections():
+    return {'📈 Overview': {'figures': {}, 'values': {'total_trades': 3},
+                           'tables': {'summary': pd.DataFrame({'PnL': [1.0, 2.0]}, index=['Fear', 'Greed'])}}}
+
+
+def test_snapshot_round_trips(tmp_path):
+    path = str(tmp_path / 'report.snap')
+    write_report_snapshot(path, make_sections(), {'fingerprint': 'abc'})
+    snapshot = ReportSnapshot(path)
+
+    assert snapshot.fingerprint == 'abc'
+    assert snapshot.manifest['schema'] == bitcoin_app.SECTION_SCHEMA_VERSION
+
+
+def test_snapshot_from_older_section_schema_is_rejected(tmp_path, monkeypatch):
+    path = str(tmp_path / 'report.snap')
+    monkeypatch.setattr(bitcoin_app, 'SECTION_SCHEMA_VERSION', bitcoin_app.SECTION_SCHEMA_VERSION - 1)
+    write_report_snapshot(path, make_sections(), {'fingerprint': 'abc'})
+    monkeypatch.undo()
+
+    with pytest.raises(ValueError, match='rebuild'):
+        ReportSnapshot(path)